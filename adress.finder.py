@@ -1,9 +1,57 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import googlemaps
+import overpy
 import folium
-from streamlit_folium import folium_static
+from streamlit_folium import folium_static, st_folium
+from folium.plugins import MarkerCluster, FastMarkerCluster
 import pandas as pd
+import numpy as np
 import re
+import os
+import sys
+import bz2
+import csv
+import gzip
+import argparse
+import json
+import math
+import codecs
+import hashlib
+import unicodedata
+import time
+import sqlite3
+import urllib.parse
+import urllib.request
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+
+try:
+    import httpx
+except ImportError:  # Only needed by the async client
+    httpx = None
+
+try:
+    import ijson
+except ImportError:  # Optional faster streaming JSON parser; a stdlib fallback is used otherwise
+    ijson = None
+
+try:
+    import osmium
+except ImportError:  # Only needed to build a gazetteer from .osm.pbf extracts
+    osmium = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # Only needed for Parquet batch files and fast vectorized string matching
+    pa = pc = pq = None
+
+from xml.etree import ElementTree
 
 # ============================
 # Streamlit Application
@@ -29,11 +77,9 @@ def main():
         st.sidebar.warning("Please enter your Google Maps API key to proceed.")
         st.stop()
     
-    # Initialize Google Maps client
+    # Initialize Google Maps client (validated once per key, then reused across reruns)
     try:
-        gmaps_client = googlemaps.Client(key=api_key)
-        # Test the API key by making a simple request
-        gmaps_client.geocode("Test")
+        gmaps_client = get_gmaps_client(api_key)
     except Exception as e:
         st.sidebar.error(f"Invalid API Key or connection error: {e}")
         st.stop()
@@ -46,120 +92,964 @@ def main():
     # Input: Search Radius
     radius_input = st.sidebar.slider("Search Radius (meters):", min_value=100, max_value=2000, value=500, step=100)
     
+    # Input: Geocoder backend (the local gazetteer is offered once it has been built)
+    geocoder_options = ["Google Maps"]
+    if os.path.exists(GAZETTEER_PATH):
+        geocoder_options.append("Local gazetteer")
+    geocoder_input = st.sidebar.selectbox("Geocoder:", geocoder_options)
+    
+    # Input: Source of nearby addresses (the local index is offered once it has been built)
+    source_options = ["Google Places", "OpenStreetMap"]
+    if os.path.isdir(POINT_INDEX_PATH):
+        source_options.append("Local address index")
+    source_input = st.sidebar.selectbox("Nearby addresses from:", source_options)
+    
+    # Input: Map tiles (changing them re-renders the map without repeating the search)
+    tiles_input = st.sidebar.selectbox("Map tiles:", MAP_TILE_OPTIONS)
+    
+    # Input: Live map keeps one Leaflet map in the browser and only sends the markers in view
+    live_map_input = st.sidebar.checkbox("Live map (incremental updates)")
+    
+    # OSM-based sources load lazily on the live map: only the tiles in view are fetched, as the user pans
+    lazy_input = live_map_input and source_input in LAZY_SOURCES
+    
+    # Results of previous searches in this session, keyed on (address, radius, geocoder, source, lazy)
+    search_key = (address_input, radius_input, geocoder_input, source_input, lazy_input)
+    search_results = st.session_state.setdefault("search_results", {})
+    
     # Button to generate map
     if st.sidebar.button("🔍 Generate Map"):
-        # Geocode the address
-        with st.spinner("📡 Geocoding the address..."):
-            main_coords = geocode_address(address_input, gmaps_client)
-        
-        if not main_coords:
-            st.error("❌ Geocoding failed: Address not found.")
-            st.stop()
-        
-        lat, lon = main_coords
-        st.success(f"✅ Coordinates: Latitude = {lat}, Longitude = {lon}")
-        
-        # Extract postcode for more accurate querying
-        postcode = extract_postcode(address_input)
-        
-        # Fetch nearby places using Google Places API
-        with st.spinner("🔄 Fetching nearby addresses from Google Places..."):
-            nearby_addresses = fetch_nearby_places(gmaps_client, main_coords, radius_input)
-        
-        if not nearby_addresses:
-            st.error("❌ No nearby addresses found.")
-            st.stop()
-        
-        st.success(f"✅ Found {len(nearby_addresses)} nearby addresses.")
-        
-        # Generate Folium map
-        with st.spinner("🗺️ Generating the map..."):
-            folium_map = generate_folium_map_google_places(address_input, main_coords, nearby_addresses, radius=radius_input)
-        
-        # Display the map
-        st.subheader("🗺️ Map Visualization")
-        folium_static(folium_map, width=700, height=500)
-        
-        # Optional: Display the list of nearby addresses
-        if st.checkbox("📋 Show Nearby Addresses"):
-            st.subheader("📌 Nearby Addresses")
-            st.write(pd.DataFrame(nearby_addresses, columns=["Nearby Addresses"]))
+        # Searches cut short by an error are shown but not reused; generating again retries them
+        if search_key not in search_results or not search_results[search_key]["complete"]:
+            search_results[search_key] = run_search(address_input, radius_input, gmaps_client, geocoder_input, source_input,
+                                                    lazy=lazy_input)
+            # Keep only the most recent searches to bound session memory
+            while len(search_results) > MAX_SESSION_SEARCHES:
+                search_results.pop(next(iter(search_results)))
+        st.session_state["active_search"] = search_key
+    
+    # Show the last generated search; widget interactions rerun the script but reuse it
+    result = search_results.get(st.session_state.get("active_search"))
+    if result is None:
+        return
+    
+    lat, lon = result["coords"]
+    st.success(f"✅ Coordinates: Latitude = {lat}, Longitude = {lon}")
+    cache_stats = get_geocode_cache().stats()
+    st.sidebar.caption(f"Geocode cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
+    if not result["complete"]:
+        st.warning(f"⚠️ Fetching nearby addresses failed part-way ({result['error']}); "
+                   "only the addresses received before the error are shown. Generate the map again to retry.")
+    if result.get("lazy"):
+        st.info("ℹ️ Nearby addresses are loaded for the part of the map in view as you pan and zoom.")
+    else:
+        st.success(f"✅ Found {len(result['places'])} nearby addresses.")
+    
+    # Display the map (identical maps are served from the rendered-HTML cache)
+    st.subheader("🗺️ Map Visualization")
+    if live_map_input:
+        # One map component per search, so a new search never inherits the bounds of the previous map
+        search_id = hashlib.sha1(repr(st.session_state["active_search"]).encode("utf-8")).hexdigest()[:12]
+        show_live_map(result, tiles_input, map_key=f"{LIVE_MAP_KEY}_{search_id}")
+    else:
+        map_html = render_map_html(result["address"], result["coords"], result["places"], result["radius"],
+                                   tiles=tiles_input, digest=result["digest"])
+        components.html(map_html, width=700, height=500)
+    
+    # Optional: Display the list of nearby addresses
+    if st.checkbox("📋 Show Nearby Addresses"):
+        st.subheader("📌 Nearby Addresses")
+        st.write(places_to_dataframe(result["places"]))
+
+MAX_SESSION_SEARCHES = 10
+
+def run_search(address_input, radius_input, gmaps_client, geocoder="Google Maps", source="Google Places", lazy=False):
+    """
+    Geocodes the address and fetches nearby places, drawing the map progressively as results arrive.
+    Returns a dict with the address, radius, coordinates, the places and a digest of the places.
+    With `lazy`, nothing is fetched here; the live map loads the places in view with load_viewport_places.
+    """
+    # Extract postcode for more accurate querying
+    postcode = extract_postcode(address_input)
+    
+    # Geocode the address
+    postcode_table = get_postcode_table()
+    with st.spinner("📡 Geocoding the address..."):
+        if geocoder == "Local gazetteer":
+            main_coords = get_local_gazetteer().geocode(address_input)
+            box = postcode_table.lookup(postcode) if postcode_table is not None and postcode else None
+            if not main_coords and box:
+                st.warning(f"Address not in the local gazetteer. Using the centre of postcode {postcode} instead.")
+                main_coords = box.centroid
+        else:
+            main_coords = geocode_address(address_input, gmaps_client, components=geocode_components(postcode),
+                                          postcode_table=postcode_table)
+    
+    if not main_coords:
+        st.error("❌ Geocoding failed: Address not found.")
+        st.stop()
     
+    if lazy:
+        nearby_places = as_place_array([])
+        return {
+            "address": address_input,
+            "radius": radius_input,
+            "coords": main_coords,
+            "places": nearby_places,
+            "digest": places_digest(nearby_places),
+            "lazy": True,
+            "source": source,
+            "loaded_tiles": set(),
+            "complete": True
+        }
+    
+    # Fetch nearby places, redrawing the map as pages arrive
+    if source == "Local address index":
+        pages = [get_point_index().query(main_coords[0], main_coords[1], radius_input)]
+    elif source == "OpenStreetMap":
+        pages = iter_osm_address_pages(main_coords[0], main_coords[1], radius_input)
+    else:
+        pages = fetch_nearby_place_pages(gmaps_client, main_coords, radius_input)
+    map_placeholder = st.empty()
+    status_placeholder = st.empty()
+    chunks = []
+    loaded = 0
+    last_redraw = 0.0
+    error = None
+    with st.spinner(f"🔄 Fetching nearby addresses from {source}..."):
+        try:
+            for page in pages:
+                # Places search is ranked by prominence and can return results outside the radius
+                chunks.append(filter_places_by_distance(page, main_coords, radius_input))
+                loaded += len(chunks[-1])
+                status_placeholder.info(f"🔄 Loaded {loaded} nearby addresses so far...")
+                # Large streamed results arrive in many pages; redrawing on each one would cost more than the download
+                if time.monotonic() - last_redraw >= MAP_REDRAW_INTERVAL:
+                    folium_map = generate_folium_map_google_places(address_input, main_coords, PlaceArray.concat(chunks), radius=radius_input)
+                    with map_placeholder.container():
+                        folium_static(folium_map, width=700, height=500)
+                    last_redraw = time.monotonic()
+        except Exception as e:
+            # Pages received before the error are still shown, but the result is marked incomplete
+            error = e
+    
+    if not loaded:
+        map_placeholder.empty()
+        status_placeholder.error(f"❌ {source} error: {error}" if error else "❌ No nearby addresses found.")
+        st.stop()
+    
+    nearby_places = filter_places_by_distance(PlaceArray.concat(chunks), main_coords, radius_input)
+    if source != "Google Places":
+        # OSM sources tag one address on several nearby nodes; Google results are distinct places
+        nearby_places = dedup_places(nearby_places)
+    map_placeholder.empty()
+    status_placeholder.empty()
+    return {
+        "address": address_input,
+        "radius": radius_input,
+        "coords": main_coords,
+        "places": nearby_places,
+        "digest": places_digest(nearby_places),
+        "complete": error is None,
+        "error": error
+    }
+
+MAP_REDRAW_INTERVAL = 1.0  # minimum seconds between progressive map redraws while results stream in
+
+# ============================
+# Place Records
+# ============================
+
+@dataclass(slots=True)
+class Place:
+    """
+    A nearby place as returned by a search, carrying its coordinates so that
+    consumers never need to geocode it again.
+    """
+    name: str
+    address: str
+    lat: float
+    lng: float
+    place_id: str = ""
+    distance_m: float = None
+
+def place_from_google_result(result):
+    """
+    Builds a Place from a single Google Places search result.
+    Returns None when the result has no usable location.
+    """
+    location = result.get('geometry', {}).get('location')
+    if not location:
+        return None
+    name = result.get('name', '')
+    address = result.get('vicinity') or result.get('formatted_address') or name
+    return Place(
+        name=name,
+        address=address,
+        lat=location['lat'],
+        lng=location['lng'],
+        place_id=result.get('place_id', '')
+    )
+
+def string_interner():
+    """
+    Returns (strings, intern) for building the string table of a PlaceArray: intern(text) returns the
+    index of `text` in `strings`, appending it on first use, so every string appears in the table once.
+    """
+    strings = []
+    table = {}
+
+    def intern(text):
+        index = table.get(text)
+        if index is None:
+            index = table[text] = len(strings)
+            strings.append(sys.intern(text))
+        return index
+
+    return strings, intern
+
+class PlaceArray:
+    """
+    Struct-of-arrays container for many places. Coordinates live in float64 arrays and the
+    name, address and place id of each row are int32 indices into one table of interned strings,
+    so repeated streets and cities are stored once and each row costs 28 bytes (36 with distances).
+    Indexing or iterating yields Place records.
+    """
+    __slots__ = ("lat", "lng", "name_ids", "address_ids", "place_id_ids", "strings", "distance_m")
+
+    def __init__(self, lat, lng, name_ids, address_ids, place_id_ids, strings, distance_m=None):
+        self.lat = lat
+        self.lng = lng
+        self.name_ids = name_ids
+        self.address_ids = address_ids
+        self.place_id_ids = place_id_ids
+        self.strings = strings
+        self.distance_m = distance_m
+
+    @classmethod
+    def from_places(cls, places):
+        """
+        Packs an iterable of Place records.
+        """
+        places = list(places)
+        count = len(places)
+        strings, intern = string_interner()
+        distance_m = None
+        if any(place.distance_m is not None for place in places):
+            distance_m = np.array([np.nan if place.distance_m is None else place.distance_m for place in places])
+        return cls(
+            np.fromiter((place.lat for place in places), dtype=np.float64, count=count),
+            np.fromiter((place.lng for place in places), dtype=np.float64, count=count),
+            np.fromiter((intern(place.name) for place in places), dtype=np.int32, count=count),
+            np.fromiter((intern(place.address) for place in places), dtype=np.int32, count=count),
+            np.fromiter((intern(place.place_id) for place in places), dtype=np.int32, count=count),
+            strings,
+            distance_m
+        )
+
+    @classmethod
+    def concat(cls, arrays):
+        """
+        Joins several PlaceArrays into one, merging their string tables.
+        """
+        arrays = [array for array in arrays if len(array)]
+        if not arrays:
+            return as_place_array([])
+        if len(arrays) == 1:
+            return arrays[0]
+        strings = []
+        table = {}
+        remapped = []
+        for array in arrays:
+            mapping = np.empty(len(array.strings), dtype=np.int32)
+            for i, text in enumerate(array.strings):
+                index = table.get(text)
+                if index is None:
+                    index = table[text] = len(strings)
+                    strings.append(text)
+                mapping[i] = index
+            remapped.append(mapping)
+        distance_m = None
+        if any(array.distance_m is not None for array in arrays):
+            distance_m = np.concatenate([array.distance_m if array.distance_m is not None else np.full(len(array), np.nan) for array in arrays])
+        return cls(
+            np.concatenate([array.lat for array in arrays]),
+            np.concatenate([array.lng for array in arrays]),
+            np.concatenate([mapping[array.name_ids] for array, mapping in zip(arrays, remapped)]),
+            np.concatenate([mapping[array.address_ids] for array, mapping in zip(arrays, remapped)]),
+            np.concatenate([mapping[array.place_id_ids] for array, mapping in zip(arrays, remapped)]),
+            strings,
+            distance_m
+        )
+
+    def __len__(self):
+        return len(self.lat)
+
+    def __getitem__(self, i):
+        distance_m = float(self.distance_m[i]) if self.distance_m is not None else None
+        return Place(
+            name=self.strings[self.name_ids[i]],
+            address=self.strings[self.address_ids[i]],
+            lat=float(self.lat[i]),
+            lng=float(self.lng[i]),
+            place_id=self.strings[self.place_id_ids[i]],
+            distance_m=None if distance_m is None or math.isnan(distance_m) else distance_m
+        )
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def rows(self):
+        """
+        Yields (name, address, lat, lng) tuples without building Place objects.
+        """
+        strings = self.strings
+        for name_id, address_id, lat, lng in zip(self.name_ids.tolist(), self.address_ids.tolist(), self.lat.tolist(), self.lng.tolist()):
+            yield strings[name_id], strings[address_id], lat, lng
+
+    def take(self, indices, distance_m=None):
+        """
+        Returns the rows at `indices` as a new PlaceArray sharing this one's string table.
+        """
+        if distance_m is None and self.distance_m is not None:
+            distance_m = self.distance_m[indices]
+        return PlaceArray(self.lat[indices], self.lng[indices], self.name_ids[indices], self.address_ids[indices],
+                          self.place_id_ids[indices], self.strings, distance_m)
+
+    def to_frame(self):
+        """
+        Returns the places as a DataFrame; string columns are categoricals over the shared string table.
+        """
+        categories = pd.Index(self.strings, dtype=object)
+        distance_m = self.distance_m if self.distance_m is not None else np.full(len(self), np.nan)
+        return pd.DataFrame({
+            "name": pd.Categorical.from_codes(self.name_ids, categories=categories),
+            "address": pd.Categorical.from_codes(self.address_ids, categories=categories),
+            "lat": self.lat,
+            "lng": self.lng,
+            "place_id": pd.Categorical.from_codes(self.place_id_ids, categories=categories),
+            "distance_m": distance_m
+        })
+
+def as_place_array(places):
+    """
+    Returns `places` as a PlaceArray, packing a list of Place records if needed.
+    """
+    return places if isinstance(places, PlaceArray) else PlaceArray.from_places(places)
+
+def places_to_dataframe(places):
+    """
+    Converts Place records into a DataFrame for display.
+    """
+    return as_place_array(places).to_frame()
+
+# ============================
+# Address Normalization
+# ============================
+
+def _build_fold_tables():
+    # The first table lower-cases and strips accents from Latin and Greek letters, maps final sigma
+    # to sigma and turns punctuation into spaces; the second transliterates Greek letters to Latin
+    accents = {}
+    for cp in list(range(0x41, 0x5B)) + list(range(0xC0, 0x250)) + list(range(0x370, 0x400)) + list(range(0x1F00, 0x2000)):
+        base = unicodedata.normalize("NFD", chr(cp))[:1].lower()
+        if base and base != chr(cp):
+            accents[cp] = base
+    accents[ord('ς')] = 'σ'
+    for char in ".,;:/\\-_'\"()[]#&+№«»":
+        accents[ord(char)] = " "
+    greek = str.maketrans({
+        'α': 'a', 'β': 'v', 'γ': 'g', 'δ': 'd', 'ε': 'e', 'ζ': 'z', 'η': 'i', 'θ': 'th', 'ι': 'i', 'κ': 'k',
+        'λ': 'l', 'μ': 'm', 'ν': 'n', 'ξ': 'x', 'ο': 'o', 'π': 'p', 'ρ': 'r', 'σ': 's', 'τ': 't',
+        'υ': 'y', 'φ': 'f', 'χ': 'ch', 'ψ': 'ps', 'ω': 'o'
+    })
+    return accents, greek
+
+_ACCENT_TABLE, _GREEK_TABLE = _build_fold_tables()
+_GREEK_DIGRAPHS = {'ου': 'ou', 'αυ': 'av', 'ευ': 'ev'}
+_GREEK_DIGRAPH_PATTERN = re.compile("|".join(_GREEK_DIGRAPHS))
+# Greeklish is written in many ways; fold the common variants onto one spelling
+_LATIN_FOLDS = [(re.compile(pattern), replacement) for pattern, replacement in [
+    (r"ou", "u"), (r"eu", "ev"), (r"au", "av"), (r"ph", "f"), (r"ks", "x"), (r"y", "i"), (r"w", "o"),
+    (r"[eo]i", "i"), (r"mp", "b"), (r"nt", "d"), (r"[gn]k", "g"), (r"ng", "g"), (r"([a-z])\1+", r"\1")
+]]
+_POSTCODE_SPACE = re.compile(r"\b(\d{3}) (\d{2})\b")
+
+def _fold(text):
+    text = text.lower().translate(_ACCENT_TABLE)
+    text = _GREEK_DIGRAPH_PATTERN.sub(lambda m: _GREEK_DIGRAPHS[m.group()], text).translate(_GREEK_TABLE)
+    for pattern, replacement in _LATIN_FOLDS:
+        text = pattern.sub(replacement, text)
+    return text
+
+# Abbreviations, aliases and filler words, applied per token after folding ("" drops the token)
+_TOKEN_REPLACEMENTS = {_fold(token): _fold(replacement) for token, replacement in {
+    "λεωφ": "λεωφορος", "λ": "λεωφορος", "leof": "λεωφορος", "av": "λεωφορος", "avenue": "λεωφορος",
+    "οδ": "", "οδος": "", "odos": "", "street": "", "str": "", "st": "",
+    "αγ": "αγιος", "ag": "αγιος", "πλ": "πλατεια", "pl": "πλατεια", "square": "πλατεια",
+    "athens": "αθηνα", "athen": "αθηνα", "piraeus": "πειραιας", "salonica": "θεσσαλονικη",
+    "ελλαδα": "", "ellada": "", "greece": "", "gr": "",
+}.items()}
+
+def normalize_address(address):
+    """
+    Normalizes an address for cache keys and deduplication.
+    Case, accents, final sigma, punctuation, Greek versus Greeklish spelling, common abbreviations
+    and the "185 46" postcode spacing are all folded, so spellings of the same address compare equal:
+    "Παπαφλέσσα 145, Αθήνα, 18546" and "ΠΑΠΑΦΛΕΣΣΑ 145 ΑΘΗΝΑ 185 46" both become "papaflesa 145 athina 18546".
+    """
+    text = _fold(_POSTCODE_SPACE.sub(r"\1\2", address))
+    tokens = []
+    for token in text.split():
+        token = _TOKEN_REPLACEMENTS.get(token, token)
+        if token:
+            tokens.append(token)
+    return " ".join(tokens)
+
+def address_key(text):
+    """
+    Order-insensitive key of an address: its normalized tokens, sorted.
+    """
+    return " ".join(sorted(normalize_address(text).split()))
+
+# ============================
+# Persistent Cache
+# ============================
+
+GEOCODE_CACHE_PATH = os.environ.get("ADDRESS_FINDER_CACHE", "address_finder_cache.sqlite")
+GEOCODE_CACHE_TTL = 30 * 24 * 3600  # seconds
+GEOCODE_CACHE_MAX_ENTRIES = 200_000
+
+class SQLiteCache:
+    """
+    A small disk-backed key/value cache stored in an SQLite table.
+    Values are stored as JSON. The database runs in WAL mode so several
+    Streamlit sessions (threads or processes) can read and write it at once.
+    Entries expire after `ttl` seconds and the oldest entries are evicted
+    once the table grows beyond `max_entries`.
+    """
+
+    def __init__(self, path, table="cache", ttl=GEOCODE_CACHE_TTL, max_entries=GEOCODE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.table = table
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed)")
+        # Short-lived processes never reach the periodic sweep, so sweep once on open
+        with self._lock:
+            self._evict(time.time())
+
+    def get(self, key):
+        """
+        Returns the cached value for `key`, or None if it is missing or expired.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        """
+        Stores `value` under `key`, evicting old entries when the cache is full.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            self._writes += 1
+            # Evicting on every write would turn each insert into a table scan
+            if self._writes % 1000 == 0:
+                self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute(f"DELETE FROM {self.table} WHERE created < ?", (now - self.ttl,))
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def stats(self):
+        """
+        Returns the hit/miss counters of this cache instance.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+_geocode_cache = None
+_geocode_cache_lock = threading.Lock()
+
+def get_geocode_cache():
+    """
+    Returns the process-wide geocode cache, opening it on first use.
+    """
+    global _geocode_cache
+    with _geocode_cache_lock:
+        if _geocode_cache is None:
+            _geocode_cache = SQLiteCache(GEOCODE_CACHE_PATH, table="geocode")
+        return _geocode_cache
+
+def geocode_cache_key(address, language, components):
+    """
+    Builds the cache key for a geocoding request from the normalized address,
+    the language and the component filter.
+    """
+    normalized = normalize_address(address)
+    components = json.dumps(components or {}, sort_keys=True, ensure_ascii=False)
+    return f"{normalized}|{language}|{components}"
+
+# ============================
+# Request Coalescing
+# ============================
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: while a call for a key is in flight, other threads asking
+    for the same key wait for it and receive its result (or its exception) instead of repeating it.
+    Streamlit runs every session in a thread of the same process, so this covers all open sessions.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._streams = {}
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = Future()
+        if not leader:
+            return call.result()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        else:
+            call.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stream(self, key, fn, *args, **kwargs):
+        """
+        Streaming variant of do for generator functions: the first caller iterates fn(*args, **kwargs),
+        and callers asking for the same key meanwhile replay the items produced so far and then follow
+        the leader, instead of starting a second identical stream.
+        """
+        with self._lock:
+            call = self._streams.get(key)
+            leader = call is None
+            if leader:
+                call = self._streams[key] = _SharedStream()
+        if not leader:
+            yield from call.follow()
+            return
+        try:
+            for item in fn(*args, **kwargs):
+                call.append(item)
+                yield item
+        except GeneratorExit:
+            call.close(RuntimeError("The shared stream was abandoned before it finished"))
+            raise
+        except BaseException as e:
+            call.close(e)
+            raise
+        else:
+            call.close()
+        finally:
+            with self._lock:
+                del self._streams[key]
+
+class _SharedStream:
+    # Items of one in-flight stream, kept until it ends so late followers can replay them
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._items = []
+        self._done = False
+        self._error = None
+
+    def append(self, item):
+        with self._condition:
+            self._items.append(item)
+            self._condition.notify_all()
+
+    def close(self, error=None):
+        with self._condition:
+            self._done = True
+            self._error = error
+            self._condition.notify_all()
+
+    def follow(self):
+        position = 0
+        while True:
+            with self._condition:
+                while position >= len(self._items) and not self._done:
+                    self._condition.wait()
+                if position >= len(self._items):
+                    if self._error is not None:
+                        raise self._error
+                    return
+                item = self._items[position]
+            position += 1
+            yield item
+
+_geocode_flight = SingleFlight()
+_places_flight = SingleFlight()
+_overpass_flight = SingleFlight()
+
 # ============================
 # Helper Functions
 # ============================
 
-def geocode_address(address, gmaps_client):
+GOOGLE_REQUEST_TIMEOUT = 10  # seconds before a single Google Maps API request is abandoned
+GOOGLE_RETRY_TIMEOUT = 20  # seconds the client keeps retrying a failing request
+GEOCODE_FALLBACK_DEADLINE = 3.0  # seconds to wait for the geocoder when a postcode centroid can stand in
+
+_geocode_executor = ThreadPoolExecutor(max_workers=4)
+
+@st.cache_resource(show_spinner=False)
+def get_gmaps_client(api_key):
+    """
+    Creates a Google Maps client for the given API key and validates it with a test request.
+    The validated client is cached per key for the whole process, so reruns do not repeat
+    the test request. A failed validation raises and is not cached, so the next run retries.
+    """
+    gmaps_client = googlemaps.Client(key=api_key, timeout=GOOGLE_REQUEST_TIMEOUT, retry_timeout=GOOGLE_RETRY_TIMEOUT)
+    # Test the API key by making a simple request
+    gmaps_client.geocode("Test")
+    return gmaps_client
+
+def lookup_geocode(address, gmaps_client, language='el', components=None, cache=None, bounds=None):
+    """
+    Geocodes the given address and returns (lat, lng), or None if Google found nothing.
+    Results are served from the persistent geocode cache when available.
+    `bounds` optionally biases the search towards a viewport, e.g. the box of the address's postcode.
+    API errors are raised to the caller.
+    """
+    if components is None:
+        components = {"country": "GR"}
+    if cache is None:
+        cache = get_geocode_cache()
+    key = geocode_cache_key(address, language, components)
+    cached = cache.get(key)
+    if cached is not None:
+        return tuple(cached)
+    # Concurrent lookups of the same key share one API call
+    options = {"language": language, "components": components}
+    if bounds is not None:
+        options["bounds"] = bounds
+    geocode_result = _geocode_flight.do(key, gmaps_client.geocode, address, **options)
+    if not geocode_result:
+        if "postal_code" in components:
+            # A mistyped postcode filters out every match; retry on the country alone
+            relaxed = {k: v for k, v in components.items() if k != "postal_code"}
+            return lookup_geocode(address, gmaps_client, language=language, components=relaxed, cache=cache, bounds=bounds)
+        return None
+    location = geocode_result[0]['geometry']['location']
+    coords = (location['lat'], location['lng'])
+    cache.set(key, coords)
+    return coords
+
+def geocode_address(address, gmaps_client, language='el', components=None, cache=None, postcode_table=None,
+                    deadline=GEOCODE_FALLBACK_DEADLINE):
     """
     Geocodes the given address using Google Maps Geocoding API and returns latitude and longitude.
+    When the component filter has a postcode and a PostcodeTable is given, the search is biased
+    towards that postcode's box, results landing outside the box are flagged, and the postcode
+    centroid is returned as an approximate location if the API call fails or takes longer than
+    `deadline` seconds.
     """
+    postcode = (components or {}).get("postal_code")
+    box = postcode_table.lookup(postcode) if postcode_table is not None and postcode else None
     try:
-        geocode_result = gmaps_client.geocode(address, language='el', components={"country": "GR"})
-        if geocode_result:
-            location = geocode_result[0]['geometry']['location']
-            return (location['lat'], location['lng'])
+        if box:
+            # A slow answer finishes in the background and still fills the cache for the next search
+            future = _geocode_executor.submit(lookup_geocode, address, gmaps_client, language=language,
+                                              components=components, cache=cache, bounds=box.bounds())
+            coords = future.result(timeout=deadline)
         else:
-            return None
+            coords = lookup_geocode(address, gmaps_client, language=language, components=components, cache=cache)
+    except FutureTimeoutError:
+        st.warning(f"Geocoding is taking too long. Using the centre of postcode {postcode} instead.")
+        return box.centroid
     except Exception as e:
+        if isinstance(e, googlemaps.exceptions.ApiError) and e.status == "REQUEST_DENIED":
+            # The key stopped working since it was validated; validate it again on the next run.
+            # Only this key's client is dropped, other sessions keep their validated clients
+            api_key = getattr(gmaps_client, "key", None)
+            if api_key is not None:
+                get_gmaps_client.clear(api_key)
+        if box:
+            st.warning(f"Geocoding error: {e}. Using the centre of postcode {postcode} instead.")
+            return box.centroid
         st.error(f"Geocoding error: {e}")
         return None
+    if coords and box and not box.contains(coords):
+        st.warning(f"⚠️ The geocoded location lies outside postcode {postcode}; the address may be ambiguous.")
+    return coords
+
+# Greek postcodes are five digits, often written with a space as "185 46"; the greedy
+# prefix makes the pattern capture the last such number in the address
+POSTCODE_PATTERN = re.compile(r'.*\b(\d{3}) ?(\d{2})\b', re.DOTALL)
 
 def extract_postcode(address):
     """
     Extracts the postcode from the address string.
-    Assumes the postcode is the last numeric component in the address.
+    Assumes the postcode is the last five-digit number in the address, with or without a space ("18546" or "185 46").
     """
-    match = re.search(r'\b\d{4,5}\b', address)
+    match = POSTCODE_PATTERN.match(address)
     if match:
-        return match.group()
+        return match.group(1) + match.group(2)
     return None
 
-def fetch_osm_addresses_overpy(api, lat, lon, radius=500):
+def extract_postcodes(addresses):
     """
-    Fetches nearby addresses from OSM using Overpy.
+    Batch variant of extract_postcode for a pandas Series, an Arrow array or any list-like of addresses.
+    Returns a Series of postcodes aligned with the input, with missing values where none was found.
+    With pyarrow installed the pattern runs in Arrow's compiled regex engine over the whole column;
+    otherwise it falls back to pandas str.extract.
+    """
+    index = addresses.index if isinstance(addresses, pd.Series) else None
+    if pc is not None:
+        array = addresses if isinstance(addresses, (pa.Array, pa.ChunkedArray)) else pa.array(addresses, type=pa.string())
+        parts = pc.extract_regex(array, r'.*\b(?P<head>\d{3}) ?(?P<tail>\d{2})\b')
+        postcodes = pc.binary_join_element_wise(pc.struct_field(parts, 'head'), pc.struct_field(parts, 'tail'), '')
+        # Relabel with the input's index; passing index= to the Series constructor would reindex instead
+        postcodes = pd.Series(postcodes.to_pandas().to_numpy(), dtype="string")
+        return postcodes if index is None else postcodes.set_axis(index)
+    if index is None:
+        addresses = pd.Series(addresses, dtype="string")
+    parts = addresses.str.extract(POSTCODE_PATTERN)
+    return parts[0].str.cat(parts[1]).astype("string").rename(None)
+
+def geocode_components(postcode=None):
+    """
+    Returns the Geocoding API component filter for Greece, restricted to the postcode when one is known.
+    """
+    components = {"country": "GR"}
+    if postcode:
+        components["postal_code"] = postcode
+    return components
+
+PLACES_PAGE_TOKEN_POLL_INTERVAL = 0.25  # seconds between retries while a page token activates
+PLACES_PAGE_TOKEN_TIMEOUT = 5.0  # give up on a page token after this many seconds
+
+def fetch_places_page(gmaps_client, location, radius, page_token=None):
+    """
+    Fetches a single page of Places Nearby Search results.
+    A fresh next_page_token is rejected with INVALID_REQUEST until Google activates it,
+    so follow-up pages are retried on a short interval until the token becomes valid.
+    """
+    # Concurrent identical searches share one call per page; waiters receive the same
+    # next_page_token, so their follow-up pages are coalesced as well
+    if page_token is None:
+        key = (tuple(location), radius)
+        return _places_flight.do(key, gmaps_client.places_nearby, location=location, radius=radius)
+    return _places_flight.do(page_token, _fetch_places_token_page, gmaps_client, page_token)
+
+def _fetch_places_token_page(gmaps_client, page_token):
+    deadline = time.monotonic() + PLACES_PAGE_TOKEN_TIMEOUT
+    while True:
+        try:
+            return gmaps_client.places_nearby(page_token=page_token)
+        except googlemaps.exceptions.ApiError as e:
+            if e.status != "INVALID_REQUEST" or time.monotonic() >= deadline:
+                raise
+            time.sleep(PLACES_PAGE_TOKEN_POLL_INTERVAL)
+
+def fetch_nearby_place_pages(gmaps_client, location, radius=500):
+    """
+    Walks the Places Nearby Search pages around `location` and yields each page as a list of Place records.
+    The request for the next page is issued in the background as soon as its token is known,
+    so it overlaps with whatever the caller does with the current page.
+    API errors are raised to the caller, also after earlier pages have been yielded.
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    try:
+        pending = executor.submit(fetch_places_page, gmaps_client, location, radius)
+        while pending is not None:
+            response = pending.result()
+            page_token = response.get('next_page_token')
+            pending = executor.submit(fetch_places_page, gmaps_client, location, radius, page_token) if page_token else None
+            places = [place_from_google_result(result) for result in response.get('results', [])]
+            yield [place for place in places if place is not None]
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def fetch_nearby_places(gmaps_client, location, radius=500):
     """
-    query = f"""
+    Fetches nearby places from Google Places, yielding Place records as soon as each page arrives.
+    """
+    for page in fetch_nearby_place_pages(gmaps_client, location, radius):
+        yield from page
+
+def build_overpass_query(lat, lon, radius=500):
+    """
+    Builds the Overpass QL query for address nodes within `radius` metres of (lat, lon).
+    """
+    return f"""
     [out:json][timeout:60];
     (
       node(around:{radius},{lat},{lon})["addr:housenumber"]["addr:street"];
     );
     out body;
     """
+
+def format_osm_address(tags):
+    """
+    Formats the addr:* tags of an OSM node into a single address string.
+    """
+    housenumber = tags.get('addr:housenumber', '')
+    street = tags.get('addr:street', '')
+    city = tags.get('addr:city', '')  # Optional
+    postcode = tags.get('addr:postcode', '')  # Optional
+    if city and postcode:
+        return f"{housenumber} {street}, {city} {postcode}"
+    elif city:
+        return f"{housenumber} {street}, {city}"
+    elif postcode:
+        return f"{housenumber} {street}, {postcode}"
+    else:
+        return f"{housenumber} {street}"
+
+def place_from_osm_node(node_id, lat, lon, tags):
+    """
+    Builds a Place from an OSM address node.
+    """
+    address = format_osm_address(tags)
+    return Place(name=address, address=address, lat=float(lat), lng=float(lon), place_id=f"osm:node/{node_id}")
+
+DEDUP_DISTANCE_M = 25.0  # places with the same street and number closer than this are merged
+
+def dedup_places(places, max_distance=DEDUP_DISTANCE_M, key_cache=None):
+    """
+    Merges duplicate places and returns a PlaceArray, keeping the first place of each group in input order.
+    Two places are duplicates when the street-and-number part of their addresses (before the first comma)
+    normalizes to the same key and they lie within `max_distance` metres, so "12 Odos" and "12 Odos, Athens"
+    on the same spot merge while the same street name in another town does not.
+    Runs in O(n) using a hash grid of `max_distance`-sized cells; pass distance-sorted input to keep the nearest.
+    Callers that deduplicate a growing result set repeatedly can pass a `key_cache` dict, which memoizes
+    the normalized keys between calls.
+    """
+    places = as_place_array(places)
+    if not len(places):
+        return places
+    if key_cache is None:
+        key_cache = {}
+    keys = {}
+    string_keys = []
+    for text in places.strings:
+        street = text.split(',')[0]
+        normalized = key_cache.get(street)
+        if normalized is None:
+            normalized = key_cache[street] = address_key(street)
+        string_keys.append(keys.setdefault(normalized, len(keys)))
+    string_keys = np.array(string_keys, dtype=np.int64)
+    row_keys = string_keys[places.address_ids]
+    # Rows whose key occurs once cannot have a duplicate; only the rest go through the grid
+    _, inverse, counts = np.unique(row_keys, return_inverse=True, return_counts=True)
+    keep = np.flatnonzero(counts[inverse] == 1).tolist()
+    candidates = np.flatnonzero(counts[inverse] > 1)
+    # Project onto a local plane in units of max_distance, so neighbours are within one cell
+    scale = 111_320.0 / max_distance
+    ys = (places.lat[candidates] * scale).tolist()
+    xs = (places.lng[candidates] * scale * math.cos(math.radians(float(np.mean(places.lat))))).tolist()
+    grid = {}
+    for position, (i, key, x, y) in enumerate(zip(candidates.tolist(), row_keys[candidates].tolist(), xs, ys)):
+        cell_x, cell_y = math.floor(x), math.floor(y)
+        duplicate = False
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in grid.get((key, cell_x + dx, cell_y + dy), ()):
+                    if (x - xs[j]) ** 2 + (y - ys[j]) ** 2 <= 1.0:
+                        duplicate = True
+                        break
+                if duplicate:
+                    break
+            if duplicate:
+                break
+        if not duplicate:
+            keep.append(i)
+            grid.setdefault((key, cell_x, cell_y), []).append(position)
+    return places.take(np.sort(np.array(keep, dtype=np.int64)))
+
+def fetch_osm_addresses_overpy(api, lat, lon, radius=500):
+    """
+    Fetches nearby addresses from OSM using Overpy.
+    Returns Place records within the radius, nearest first.
+    """
+    query = build_overpass_query(lat, lon, radius)
     try:
-        result = api.query(query)
-        addresses = []
-        for node in result.nodes:
-            housenumber = node.tags.get('addr:housenumber', '')
-            street = node.tags.get('addr:street', '')
-            city = node.tags.get('addr:city', '')  # Optional
-            postcode = node.tags.get('addr:postcode', '')  # Optional
-            if city and postcode:
-                address = f"{housenumber} {street}, {city} {postcode}"
-            elif city:
-                address = f"{housenumber} {street}, {city}"
-            elif postcode:
-                address = f"{housenumber} {street}, {postcode}"
-            else:
-                address = f"{housenumber} {street}"
-            addresses.append(address)
-        return list(set(addresses))  # Remove duplicates
+        result = _overpass_flight.do(query, api.query, query)
+        places = [place_from_osm_node(node.id, node.lat, node.lon, node.tags) for node in result.nodes]
+        return dedup_places(filter_places_by_distance(places, (lat, lon), radius))
     except Exception as e:
         st.error(f"Overpass API error: {e}")
-        return []
+        return as_place_array([])
+
+MAP_TILE_OPTIONS = ["Stamen Toner", "OpenStreetMap", "CartoDB positron"]
+MAP_TILE_ATTRIBUTIONS = {
+    'Stamen Toner': 'Map tiles by Stamen Design, under CC BY 3.0. Data by Google Places.'
+}
+FAST_MARKER_THRESHOLD = 1000  # above this many places, markers are built in the browser
 
-def generate_folium_map_google_places(main_address, main_coords, nearby_addresses, radius=500):
+# Builds one marker per [lat, lng, popup] row in the browser, like the per-place folium.Marker below
+FAST_MARKER_CALLBACK = """
+function (row) {
+    var icon = L.AwesomeMarkers.icon({icon: 'home', prefix: 'glyphicon', markerColor: 'blue'});
+    return L.marker(new L.LatLng(row[0], row[1]), {icon: icon}).bindPopup(row[2]);
+}
+"""
+
+def generate_folium_map_google_places(main_address, main_coords, nearby_places, radius=500, fast_threshold=FAST_MARKER_THRESHOLD,
+                                      tiles='Stamen Toner'):
     """
-    Generates a Folium map with the main address and nearby addresses fetched from Google Places.
+    Generates a Folium map with the main address and nearby places fetched from Google Places.
+    Marker coordinates are taken from the Place records, so no further API calls are made.
+    Above `fast_threshold` places, the markers are shipped as one compact array to a FastMarkerCluster
+    instead of one folium.Marker each, which keeps the HTML small and the browser responsive.
+    The static map cannot ask for new markers as the user zooms, so every place is always sent;
+    precomputed clusters (PointClusterIndex) are only used by the live map, which can.
     """
-    lat, lon = main_coords
+    nearby_places = as_place_array(nearby_places)
     
     # Initialize the Folium map centered at the main address
     try:
         m = folium.Map(
             location=main_coords,
             zoom_start=17,
-            tiles='Stamen Toner',
-            attr='Map tiles by Stamen Design, under CC BY 3.0. Data by Google Places.'
+            tiles=tiles,
+            attr=MAP_TILE_ATTRIBUTIONS.get(tiles)
         )
     except ValueError as ve:
         st.warning(f"Tile attribution error: {ve}. Switching to 'OpenStreetMap' tiles.")
@@ -181,25 +1071,1546 @@ def generate_folium_map_google_places(main_address, main_coords, nearby_addresse
         fill=False
     ).add_to(m)
     
+    if len(nearby_places) > fast_threshold:
+        # OSM places use the address as the name; don't repeat it in the popup
+        data = [
+            [place_lat, place_lng, address if name == address else f"<b>{name}</b><br>{address}"]
+            for name, address, place_lat, place_lng in nearby_places.rows()
+        ]
+        FastMarkerCluster(data=data, callback=FAST_MARKER_CALLBACK).add_to(m)
+        return m
+    
     # Add a marker cluster for nearby addresses
-    marker_cluster = folium.plugins.MarkerCluster().add_to(m)
+    marker_cluster = MarkerCluster().add_to(m)
+    
+    # Add nearby places markers (Blue)
+    for name, address, place_lat, place_lng in nearby_places.rows():
+        folium.Marker(
+            location=(place_lat, place_lng),
+            popup=f"<b>{name}</b><br>{address}",
+            icon=folium.Icon(color='blue', icon='home')
+        ).add_to(marker_cluster)
     
-    # Add nearby addresses markers (Blue)
-    for address in nearby_addresses:
-        # Geocode each nearby address to get coordinates
-        coords = geocode_address(address, gmaps_client=gmaps_client)
-        if coords:
+    return m
+
+# ============================
+# Point Clustering
+# ============================
+
+CLUSTER_RADIUS_PX = 60  # points closer than this on screen are merged into one cluster
+CLUSTER_MAX_ZOOM = 17  # above this zoom every point is shown on its own
+
+def _to_mercator(lats, lngs):
+    # Web Mercator in unit coordinates: x and y both run from 0 to 1 over the world
+    sin_lat = np.clip(np.sin(np.radians(lats)), -0.9999, 0.9999)
+    x = (np.asarray(lngs) + 180.0) / 360.0
+    y = 0.5 - 0.25 * np.log((1 + sin_lat) / (1 - sin_lat)) / np.pi
+    return x, y
+
+def _from_mercator(x, y):
+    lngs = np.asarray(x) * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y)))))
+    return lats, lngs
+
+def _cluster_level(xs, ys, counts, ids, radius):
+    # Greedy single pass: each unvisited point absorbs its unvisited neighbours within `radius`,
+    # found through a hash grid of radius-sized cells, into a count-weighted centroid
+    xs, ys, counts, ids = xs.tolist(), ys.tolist(), counts.tolist(), ids.tolist()
+    grid = {}
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        grid.setdefault((int(x / radius), int(y / radius)), []).append(i)
+    visited = bytearray(len(xs))
+    radius_sq = radius * radius
+    out_x, out_y, out_count, out_id = [], [], [], []
+    for i, (x, y) in enumerate(zip(xs, ys)):
+        if visited[i]:
+            continue
+        visited[i] = 1
+        cell_x, cell_y = int(x / radius), int(y / radius)
+        weight = counts[i]
+        sum_x, sum_y, total = x * weight, y * weight, weight
+        merged = False
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for j in grid.get((cell_x + dx, cell_y + dy), ()):
+                    if not visited[j] and (xs[j] - x) ** 2 + (ys[j] - y) ** 2 <= radius_sq:
+                        visited[j] = 1
+                        sum_x += xs[j] * counts[j]
+                        sum_y += ys[j] * counts[j]
+                        total += counts[j]
+                        merged = True
+        if merged:
+            out_x.append(sum_x / total)
+            out_y.append(sum_y / total)
+            out_count.append(total)
+            out_id.append(-1)
+        else:
+            out_x.append(x)
+            out_y.append(y)
+            out_count.append(counts[i])
+            out_id.append(ids[i])
+    return np.array(out_x), np.array(out_y), np.array(out_count, dtype=np.int64), np.array(out_id, dtype=np.int64)
+
+class PointClusterIndex:
+    """
+    Supercluster-style hierarchy of point clusters, precomputed once for every zoom level.
+    Each level clusters the level above it, so building is roughly linear in the number of points,
+    and get_clusters then answers "what is visible in this viewport at this zoom" with a single mask.
+    """
+
+    def __init__(self, lats, lngs, radius_px=CLUSTER_RADIUS_PX, max_zoom=CLUSTER_MAX_ZOOM, min_zoom=0, tile_size=256):
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        x, y = _to_mercator(np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64))
+        # Level max_zoom + 1 holds the raw points: (x, y, count, point index or -1 for clusters)
+        level = (x, y, np.ones(len(x), dtype=np.int64), np.arange(len(x), dtype=np.int64))
+        self.levels = {max_zoom + 1: level}
+        for zoom in range(max_zoom, min_zoom - 1, -1):
+            level = _cluster_level(*level, radius=radius_px / (tile_size * 2 ** zoom))
+            self.levels[zoom] = level
+
+    def get_clusters(self, bounds, zoom):
+        """
+        Returns (lats, lngs, counts, point_ids) of the clusters and single points inside
+        bounds = (south, west, north, east) at `zoom`. point_ids is -1 for clusters and the
+        index of the original point otherwise.
+        """
+        zoom = min(max(int(zoom), self.min_zoom), self.max_zoom + 1)
+        x, y, counts, ids = self.levels[zoom]
+        south, west, north, east = bounds
+        (x0, x1), (y1, y0) = _to_mercator(np.array([south, north]), np.array([west, east]))
+        inside = (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+        lats, lngs = _from_mercator(x[inside], y[inside])
+        return lats, lngs, counts[inside], ids[inside]
+
+def fit_zoom(lat, radius, map_px=500):
+    """
+    Returns the largest zoom at which a circle of `radius` metres fits in `map_px` pixels.
+    """
+    metres_per_px_at_zoom0 = 156_543.03392 * math.cos(math.radians(lat))
+    return int(min(max(math.floor(math.log2(metres_per_px_at_zoom0 * map_px / (2 * radius))), 0), 18))
+
+def view_bounds(lat, lon, zoom, width_px=700, height_px=500):
+    """
+    Returns (south, west, north, east) of a `width_px` x `height_px` map centred on (lat, lon) at `zoom`.
+    """
+    metres_per_px = 156_543.03392 * math.cos(math.radians(lat)) / 2 ** zoom
+    dlat = metres_per_px * height_px / 2 / 111_320.0
+    dlon = metres_per_px * width_px / 2 / (111_320.0 * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+def radius_bounds(lat, lon, radius):
+    """
+    Returns (south, west, north, east) of the box around the circle of `radius` metres.
+    """
+    dlat = radius / 111_320.0
+    dlon = radius / (111_320.0 * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+def add_clusters_to_map(m, cluster_index, places, bounds, zoom):
+    """
+    Adds the clusters visible in `bounds` at `zoom` to the map: clusters as count bubbles,
+    single points as the usual blue markers.
+    """
+    lats, lngs, counts, ids = cluster_index.get_clusters(bounds, zoom)
+    for lat, lng, count, point_id in zip(lats.tolist(), lngs.tolist(), counts.tolist(), ids.tolist()):
+        if point_id >= 0:
+            place = places[point_id]
             folium.Marker(
-                location=coords,
-                popup=address,
+                location=(lat, lng),
+                popup=f"<b>{place.name}</b><br>{place.address}",
                 icon=folium.Icon(color='blue', icon='home')
-            ).add_to(marker_cluster)
+            ).add_to(m)
+        else:
+            size = 30 if count < 100 else 40 if count < 1000 else 50
+            folium.Marker(
+                location=(lat, lng),
+                popup=f"{count} addresses",
+                icon=folium.DivIcon(
+                    html=f'<div style="width:{size}px;height:{size}px;line-height:{size}px;border-radius:50%;'
+                         f'background:rgba(49,135,204,0.75);color:white;text-align:center;font-weight:bold;">{count}</div>',
+                    icon_size=(size, size),
+                    icon_anchor=(size // 2, size // 2)
+                )
+            ).add_to(m)
+
+# ============================
+# Rendered Map Cache
+# ============================
+
+MAP_CACHE_SIZE = 32  # rendered maps kept in memory
+MAP_CACHE_DIR = os.environ.get("ADDRESS_FINDER_MAP_CACHE")  # optional directory for a disk tier
+MAP_CACHE_MAX_BYTES = 256 * 1024 * 1024  # size of the disk tier before the least recently used maps are removed
+
+class MapHTMLCache:
+    """
+    Two-tier cache of rendered map HTML: an in-memory LRU of `max_entries` maps in front of an
+    optional directory of HTML files, so maps survive restarts and are shared between processes.
+    The directory is kept under `max_bytes` by removing the least recently used files; a file's
+    modification time is refreshed whenever it is read.
+    """
+
+    def __init__(self, max_entries=MAP_CACHE_SIZE, directory=MAP_CACHE_DIR, max_bytes=MAP_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._evict()
+
+    def get(self, key):
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                return html
+        if self.directory:
+            path = os.path.join(self.directory, f"{key}.html")
+            try:
+                with open(path, encoding="utf-8") as f:
+                    html = f.read()
+                os.utime(path)
+            except FileNotFoundError:
+                return None
+            self._remember(key, html)
+        return html
+
+    def set(self, key, html):
+        self._remember(key, html)
+        if self.directory:
+            path = os.path.join(self.directory, f"{key}.html")
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(html)
+            os.replace(tmp_path, path)
+            with self._lock:
+                self._writes += 1
+                sweep = self._writes % 50 == 0
+            if sweep:
+                self._evict()
+
+    def _evict(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".html"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # removed by another process meanwhile
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def _remember(self, key, html):
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+_map_html_cache = MapHTMLCache()
+
+def places_digest(places):
+    """
+    Returns a digest of a result set that changes whenever any place, its position or the order changes.
+    """
+    places = as_place_array(places)
+    digest = hashlib.sha1()
+    for array in (places.lat, places.lng, places.name_ids, places.address_ids, places.place_id_ids):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    digest.update("\0".join(places.strings).encode("utf-8"))
+    return digest.hexdigest()
+
+def render_map_html(main_address, main_coords, places, radius=500, tiles='Stamen Toner', digest=None, cache=None):
+    """
+    Returns the HTML of the map for a search, rendering it with generate_folium_map_google_places
+    only when an identical map (same address, centre, radius, tiles and result digest) is not cached.
+    """
+    if cache is None:
+        cache = _map_html_cache
+    if digest is None:
+        digest = places_digest(places)
+    key_source = f"{main_address}|{main_coords[0]:.6f},{main_coords[1]:.6f}|{radius}|{tiles}|{digest}"
+    key = hashlib.sha1(key_source.encode("utf-8")).hexdigest()
+    html = cache.get(key)
+    if html is None:
+        folium_map = generate_folium_map_google_places(main_address, main_coords, places, radius=radius, tiles=tiles)
+        html = folium_map.get_root().render()
+        cache.set(key, html)
+    return html
+
+# ============================
+# Live Map
+# ============================
+
+LIVE_MAP_KEY = "live_map"
+LAZY_SOURCES = ("OpenStreetMap", "Local address index")  # sources that can be loaded tile by tile
+VIEWPORT_MARGIN = 0.25  # fraction of the viewport loaded beyond each edge, so short pans need no fetch
+VIEWPORT_MAX_TILES = 16  # most tiles fetched for one view; zoomed out further, the user is asked to zoom in
+LAZY_START_ZOOM = 17  # the first view of a lazy search spans a few tiles rather than the whole radius
+
+def build_live_base_map(tiles='Stamen Toner'):
+    """
+    Returns the base map of the live view: tiles only, so its HTML is the same for every search and
+    st_folium keeps the Leaflet map alive, updating its centre, zoom and result layer in place.
+    """
+    try:
+        return folium.Map(tiles=tiles, attr=MAP_TILE_ATTRIBUTIONS.get(tiles))
+    except ValueError as ve:
+        st.warning(f"Tile attribution error: {ve}. Switching to 'OpenStreetMap' tiles.")
+        return folium.Map(tiles='OpenStreetMap')
+
+def viewport_from_map_state(map_state):
+    """
+    Returns (bounds, zoom) from the state st_folium returns, with bounds = (south, west, north, east),
+    or None before the map has reported its viewport.
+    """
+    bounds = (map_state or {}).get("bounds") or {}
+    south_west, north_east = bounds.get("_southWest"), bounds.get("_northEast")
+    if not south_west or not north_east or south_west.get("lat") is None or map_state.get("zoom") is None:
+        return None
+    return (south_west["lat"], south_west["lng"], north_east["lat"], north_east["lng"]), int(map_state["zoom"])
+
+def build_live_layer(result, bounds, zoom):
+    """
+    Returns the result layer of the live view: the main address, the radius circle and the clusters
+    of the result set visible in `bounds` at `zoom`, so each update only carries what is on screen.
+    """
+    places = result["places"]
+    if "cluster_index" not in result:
+        result["cluster_index"] = PointClusterIndex(places.lat, places.lng)
+    layer = folium.FeatureGroup(name="Nearby addresses")
+    folium.Marker(
+        location=result["coords"],
+        popup=f"<b>Main Address:</b><br>{result['address']}",
+        icon=folium.Icon(color='red', icon='info-sign')
+    ).add_to(layer)
+    folium.Circle(
+        radius=result["radius"],
+        location=result["coords"],
+        popup='Search Radius',
+        color='blue',
+        fill=False
+    ).add_to(layer)
+    add_clusters_to_map(layer, result["cluster_index"], places, bounds, zoom)
+    return layer
+
+def load_viewport_places(result, bounds, margin=VIEWPORT_MARGIN, max_tiles=VIEWPORT_MAX_TILES):
+    """
+    Loads the places of a lazy search inside `bounds` (plus `margin` of the viewport on each side when
+    that fits the budget, clipped to the search radius) into result["places"], one Overpass tile at a time.
+    Tiles already loaded are skipped, so each pan only costs the tiles that came into view.
+    Returns the number of tiles loaded, or None when the view needs more than `max_tiles` new tiles.
+    """
+    lat, lon = result["coords"]
+    r_south, r_west, r_north, r_east = radius_bounds(lat, lon, result["radius"])
+    for view_margin in (margin, 0.0):
+        south, west, north, east = bounds
+        dlat, dlon = (north - south) * view_margin, (east - west) * view_margin
+        south, west = max(south - dlat, r_south), max(west - dlon, r_west)
+        north, east = min(north + dlat, r_north), min(east + dlon, r_east)
+        if south >= north or west >= east:
+            return 0
+        tiles = [tile for tile in tiles_in_bbox(south, west, north, east) if tile not in result["loaded_tiles"]]
+        if len(tiles) <= max_tiles:
+            break
+    else:
+        return None
+    if not tiles:
+        return 0
     
-    return m
+    if result["source"] == "Local address index":
+        point_index = get_point_index()
+        chunks = []
+        for tile in tiles:
+            t_south, t_west, t_north, t_east = tile_bounds(*tile)
+            t_lat, t_lon = (t_south + t_north) / 2, (t_west + t_east) / 2
+            t_radius = haversine_distances(t_lat, t_lon, np.array([t_south]), np.array([t_west]))[0] + 1.0
+            found = point_index.query(t_lat, t_lon, t_radius)
+            # Circles around neighbouring tiles overlap; keep each point only in the tile that contains it
+            inside = (found.lat >= t_south) & (found.lat < t_north) & (found.lng >= t_west) & (found.lng < t_east)
+            chunks.append(found.take(np.flatnonzero(inside)))
+        new_places = PlaceArray.concat(chunks)
+    else:
+        try:
+            found = fetch_osm_tiles(overpy.Overpass(), tiles)
+        except Exception as e:
+            st.error(f"Overpass API error: {e}")
+            return 0
+        new_places = as_place_array([place for tile in found.values() for place in tile])
+    
+    places = filter_places_by_distance(PlaceArray.concat([result["places"], new_places]), result["coords"], result["radius"])
+    result["places"] = dedup_places(places, key_cache=result.setdefault("address_keys", {}))
+    result["digest"] = places_digest(result["places"])
+    result["loaded_tiles"].update(tiles)
+    result.pop("cluster_index", None)
+    return len(tiles)
+
+def show_live_map(result, tiles='Stamen Toner', map_key=LIVE_MAP_KEY):
+    """
+    Shows a search on the live map and returns the viewport its layer was built for as (bounds, zoom).
+    Panning or zooming reruns the script with the new bounds already in st.session_state[map_key]
+    (st_folium stores them there before the rerun), so each interaction costs a single rerun.
+    """
+    lat, lon = result["coords"]
+    if result.get("lazy"):
+        # Until the map reports its bounds, assume the view the map opens with, not the whole radius
+        start_zoom = LAZY_START_ZOOM
+        start_bounds = view_bounds(lat, lon, start_zoom)
+    else:
+        start_zoom = fit_zoom(lat, result["radius"])
+        start_bounds = radius_bounds(lat, lon, result["radius"])
+    viewport = viewport_from_map_state(st.session_state.get(map_key)) or (start_bounds, start_zoom)
+    if result.get("lazy"):
+        loaded = load_viewport_places(result, viewport[0])
+        if loaded is None:
+            st.info("ℹ️ Zoom in to load the nearby addresses in this part of the map.")
+        st.caption(f"{len(result['places'])} nearby addresses loaded so far.")
+    st_folium(
+        build_live_base_map(tiles),
+        key=map_key,
+        center=result["coords"],
+        zoom=start_zoom,
+        feature_group_to_add=build_live_layer(result, *viewport),
+        returned_objects=["bounds", "zoom"],
+        width=700,
+        height=500
+    )
+    return viewport
+
+# ============================
+# Local Gazetteer
+# ============================
+
+GAZETTEER_PATH = os.environ.get("ADDRESS_FINDER_GAZETTEER", "greece_gazetteer.sqlite")
+
+def iter_osm_address_nodes(osm_path):
+    """
+    Yields (node_id, lat, lon, tags) for every node in an OSM extract that has both
+    addr:street and addr:housenumber. Reads .osm XML (optionally .bz2/.gz compressed)
+    incrementally; .pbf extracts need the optional 'osmium' package.
+    """
+    if osm_path.endswith(".pbf"):
+        if osmium is None:
+            raise RuntimeError("Reading .osm.pbf extracts requires the 'osmium' package.")
+        for node in osmium.FileProcessor(osm_path, osmium.osm.NODE):
+            tags = dict(node.tags)
+            if 'addr:street' in tags and 'addr:housenumber' in tags:
+                yield node.id, node.location.lat, node.location.lon, tags
+        return
+    if osm_path.endswith(".bz2"):
+        source = bz2.open(osm_path, "rb")
+    elif osm_path.endswith(".gz"):
+        source = gzip.open(osm_path, "rb")
+    else:
+        source = open(osm_path, "rb")
+    with source:
+        root = None
+        for event, element in ElementTree.iterparse(source, events=("start", "end")):
+            if root is None:
+                root = element
+            if event != "end":
+                continue
+            if element.tag == "node":
+                tags = {tag.get('k'): tag.get('v') for tag in element.iter("tag")}
+                if 'addr:street' in tags and 'addr:housenumber' in tags:
+                    yield int(element.get('id')), float(element.get('lat')), float(element.get('lon')), tags
+            if element.tag in ("node", "way", "relation"):
+                # Clearing the element alone leaves an empty child behind on the root for every element read
+                root.clear()
+
+def gazetteer_key(text):
+    """
+    Builds the lookup key for a "street housenumber" string from its normalized form.
+    Tokens are sorted so that "Παπαφλέσσα 145" and "145 Papaflessa" share a key.
+    Gazetteers built before a change to normalize_address must be rebuilt.
+    """
+    return address_key(text)
+
+def build_gazetteer(osm_path, db_path=GAZETTEER_PATH, batch_size=50_000):
+    """
+    Builds the local gazetteer database at `db_path` from an OSM extract, replacing any existing one.
+    Returns the number of address nodes indexed.
+    """
+    tmp_path = db_path + ".building"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    conn.execute(
+        "CREATE TABLE addresses (key TEXT NOT NULL, postcode TEXT, lat REAL NOT NULL, lon REAL NOT NULL, "
+        "street TEXT, housenumber TEXT, city TEXT, node_id INTEGER NOT NULL)"
+    )
+    count = 0
+    batch = []
+    for node_id, lat, lon, tags in iter_osm_address_nodes(osm_path):
+        street = tags['addr:street']
+        housenumber = tags['addr:housenumber']
+        postcode = extract_postcode(tags.get('addr:postcode', ''))
+        batch.append((gazetteer_key(f"{street} {housenumber}"), postcode, lat, lon, street, housenumber, tags.get('addr:city'), node_id))
+        if len(batch) >= batch_size:
+            conn.executemany("INSERT INTO addresses VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+            count += len(batch)
+            batch = []
+    conn.executemany("INSERT INTO addresses VALUES (?, ?, ?, ?, ?, ?, ?, ?)", batch)
+    count += len(batch)
+    # Creating the index after the bulk load is much faster than maintaining it during inserts
+    conn.execute("CREATE INDEX addresses_key ON addresses (key, postcode)")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, db_path)
+    return count
+
+class LocalGazetteer:
+    """
+    Read-only geocoder answering from a database built by build_gazetteer, without any network access.
+    """
+
+    def __init__(self, db_path=GAZETTEER_PATH):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, check_same_thread=False)
+
+    def geocode(self, address):
+        """
+        Returns (lat, lng) for the address, or None if it is not in the gazetteer.
+        The street and house number are looked for in the first comma-separated part of the address,
+        with its postcode (spaced or not) removed. Without commas the city and other trailing words
+        are in that part too, so every leading run of its words is tried and the longest match wins.
+        A postcode anywhere in the address is used to prefer matches in that postcode.
+        """
+        postcode = extract_postcode(address)
+        tokens = [token for token in normalize_address(address.split(',')[0]).split() if token != postcode]
+        candidates = {" ".join(sorted(tokens[:n])): n for n in range(1, len(tokens) + 1)}
+        if not candidates:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, lat, lon FROM addresses WHERE key IN ({', '.join('?' * len(candidates))}) "
+                "ORDER BY postcode IS NOT ?",
+                (*candidates, postcode)
+            ).fetchall()
+        if not rows:
+            return None
+        # max keeps the first of equally long matches, which the ORDER BY puts in the postcode
+        _, lat, lon = max(rows, key=lambda row: candidates[row[0]])
+        return lat, lon
+
+@st.cache_resource(show_spinner=False)
+def get_local_gazetteer(db_path=GAZETTEER_PATH):
+    """
+    Opens the local gazetteer once per process.
+    """
+    return LocalGazetteer(db_path)
+
+# ============================
+# Overpass Tile Cache
+# ============================
+
+OVERPASS_TILE_ZOOM = 16  # slippy-map zoom of the cached tiles (about 480 m across in Athens)
+OVERPASS_TILE_TTL = 7 * 24 * 3600  # seconds
+
+_overpass_tile_cache = None
+
+def get_overpass_tile_cache():
+    """
+    Returns the process-wide Overpass tile cache, stored next to the geocode cache.
+    """
+    global _overpass_tile_cache
+    with _geocode_cache_lock:
+        if _overpass_tile_cache is None:
+            _overpass_tile_cache = SQLiteCache(GEOCODE_CACHE_PATH, table="overpass_tiles", ttl=OVERPASS_TILE_TTL)
+        return _overpass_tile_cache
+
+def lat_lon_to_tile(lat, lon, zoom=OVERPASS_TILE_ZOOM):
+    """
+    Returns the (x, y) slippy-map tile containing (lat, lon) at `zoom`.
+    """
+    n = 2 ** zoom
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def tile_bounds(x, y, zoom=OVERPASS_TILE_ZOOM):
+    """
+    Returns (south, west, north, east) of a slippy-map tile.
+    """
+    n = 2 ** zoom
+    west = x / n * 360.0 - 180.0
+    east = (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return south, west, north, east
+
+def tiles_in_bbox(south, west, north, east, zoom=OVERPASS_TILE_ZOOM):
+    """
+    Returns the tiles covering a bounding box, row by row.
+    """
+    x0, y0 = lat_lon_to_tile(north, west, zoom)
+    x1, y1 = lat_lon_to_tile(south, east, zoom)
+    return [(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)]
+
+def covering_tiles(lat, lon, radius, zoom=OVERPASS_TILE_ZOOM):
+    """
+    Returns the tiles covering the circle of `radius` metres around (lat, lon).
+    """
+    dlat = radius / 111_320.0
+    dlon = radius / (111_320.0 * max(math.cos(math.radians(lat)), 1e-6))
+    return tiles_in_bbox(lat - dlat, lon - dlon, lat + dlat, lon + dlon, zoom)
+
+def build_overpass_tiles_query(tiles, zoom=OVERPASS_TILE_ZOOM):
+    """
+    Builds one Overpass QL query for the address nodes of several tiles, with a bbox clause per tile.
+    """
+    clauses = "\n".join(
+        '      node({:.7f},{:.7f},{:.7f},{:.7f})["addr:housenumber"]["addr:street"];'.format(*tile_bounds(x, y, zoom))
+        for x, y in tiles
+    )
+    return f"""
+    [out:json][timeout:60];
+    (
+{clauses}
+    );
+    out body;
+    """
+
+def store_osm_tiles(cache, tiles, zoom=OVERPASS_TILE_ZOOM):
+    """
+    Caches the places of each tile in {tile: [Place, ...]}, including empty tiles.
+    """
+    for (x, y), places in tiles.items():
+        cache.set(f"z{zoom}/{x}/{y}", [[place.name, place.address, place.lat, place.lng, place.place_id] for place in places])
+
+def fetch_osm_tiles(api, tiles, zoom=OVERPASS_TILE_ZOOM, cache=None):
+    """
+    Returns {tile: [Place, ...]} for the given tiles. Cached tiles are served from disk;
+    the missing ones are fetched together in a single Overpass query, split per tile and cached.
+    """
+    if cache is None:
+        cache = get_overpass_tile_cache()
+    found = {}
+    missing = []
+    for tile in tiles:
+        cached = cache.get(f"z{zoom}/{tile[0]}/{tile[1]}")
+        if cached is None:
+            missing.append(tile)
+        else:
+            found[tile] = [Place(*values) for values in cached]
+    if missing:
+        query = build_overpass_tiles_query(missing, zoom)
+        result = _overpass_flight.do(query, api.query, query)
+        fetched = {tile: [] for tile in missing}
+        for node in result.nodes:
+            tile = lat_lon_to_tile(float(node.lat), float(node.lon), zoom)
+            if tile in fetched:
+                fetched[tile].append(place_from_osm_node(node.id, node.lat, node.lon, node.tags))
+        store_osm_tiles(cache, fetched, zoom)
+        found.update(fetched)
+    return found
+
+def fetch_osm_addresses_tiled(api, lat, lon, radius=500, cache=None):
+    """
+    Fetches nearby addresses from OSM one fixed tile at a time, so neighbouring searches reuse cached tiles.
+    The radius answer is assembled from the covering tiles and filtered by distance, nearest first.
+    """
+    try:
+        tiles = fetch_osm_tiles(api, covering_tiles(lat, lon, radius), cache=cache)
+    except Exception as e:
+        st.error(f"Overpass API error: {e}")
+        return as_place_array([])
+    places = [place for tile in tiles.values() for place in tile]
+    return dedup_places(filter_places_by_distance(places, (lat, lon), radius))
+
+# ============================
+# Streaming Overpass Parser
+# ============================
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+OVERPASS_STREAM_CHUNK = 64 * 1024  # bytes read from the response at a time
+
+def iter_json_array_items(stream, key, chunk_size=OVERPASS_STREAM_CHUNK, check_document=None):
+    """
+    Incrementally decodes the items of the top-level array `key` in a JSON document read from a
+    binary stream, yielding each item as soon as it is complete. Only the text before the array and
+    the unparsed tail of the response are kept in memory.
+    Once the array ends, the rest of the document is read too and, with the array left empty, passed
+    to `check_document`, which can raise on errors reported after the items (such as an Overpass remark).
+    A document without the array is also passed to `check_document` and then raises ValueError.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer = ""
+    head = None  # the document up to and including the opening bracket of the array
+    position = None  # index just inside the array once it has been found
+    eof = False
+    while True:
+        if not eof:
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += utf8.decode(chunk, final=eof)
+        if position is None:
+            match = re.search(r'"%s"\s*:\s*\[' % re.escape(key), buffer)
+            if match is None:
+                if eof:
+                    if check_document is not None:
+                        check_document(json.loads(buffer))
+                    raise ValueError(f'The JSON document has no "{key}" array')
+                continue
+            head = buffer[:match.end()]
+            position = match.end()
+        while True:
+            # Skip separators between items
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position < len(buffer) and buffer[position] == "]":
+                if check_document is not None:
+                    tail = buffer[position:]
+                    while not eof:
+                        chunk = stream.read(chunk_size)
+                        eof = not chunk
+                        tail += utf8.decode(chunk, final=eof)
+                    check_document(json.loads(head + tail))
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except ValueError:
+                if eof:
+                    raise
+                break  # the item is incomplete; read more
+            yield item
+            position = end
+        buffer = buffer[position:]
+        position = 0
+
+def check_overpass_document(document):
+    """
+    Raises the overpy exception for the "remark" of an Overpass response, as overpy does.
+    Overpass answers timeouts and memory limits with HTTP 200 and a truncated element list,
+    which must not be mistaken for a complete (possibly empty) answer.
+    """
+    remark = (document.get("remark") or "").strip()
+    if not remark:
+        return
+    if remark.startswith("runtime error:"):
+        raise overpy.exception.OverpassRuntimeError(msg=remark)
+    if remark.startswith("runtime remark:"):
+        raise overpy.exception.OverpassRuntimeRemark(msg=remark)
+    raise overpy.exception.OverpassUnknownError(msg=remark)
+
+def _iter_ijson_elements(response):
+    # ijson.items cannot report the remark that follows the elements, so build the items from parse events
+    builder = None
+    document = {}
+    found = False
+    for prefix, event, value in ijson.parse(response, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if prefix == "elements.item" and event == "end_map":
+                yield builder.value
+                builder = None
+        elif prefix == "elements.item" and event == "start_map":
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+        elif prefix == "elements" and event == "start_array":
+            found = True
+        elif prefix == "remark" and event == "string":
+            document["remark"] = value
+    check_overpass_document(document)
+    if not found:
+        raise ValueError('The JSON document has no "elements" array')
+
+def iter_overpass_elements(query, url=OVERPASS_URL, timeout=90):
+    """
+    Runs an Overpass QL query and yields the response's elements while the body is still downloading.
+    Uses ijson when it is installed and the stdlib incremental decoder otherwise.
+    A runtime error or remark reported by Overpass after the elements is raised once they are consumed.
+    """
+    data = urllib.parse.urlencode({"data": query}).encode("utf-8")
+    with urllib.request.urlopen(urllib.request.Request(url, data=data), timeout=timeout) as response:
+        if ijson is not None:
+            yield from _iter_ijson_elements(response)
+        else:
+            yield from iter_json_array_items(response, "elements", check_document=check_overpass_document)
+
+def iter_osm_address_pages(lat, lon, radius=500, url=OVERPASS_URL, cache=None, page_size=1000):
+    """
+    Streaming counterpart of fetch_osm_addresses_tiled: yields lists of Place records as they arrive,
+    so large radii start rendering before the download finishes. Cached tiles are yielded first;
+    the missing tiles are streamed in one Overpass query and cached once complete.
+    Pages are not filtered by distance, sorted or deduplicated; callers do that once results have
+    accumulated, so dedup_places sees every node and keeps the nearest of each group.
+    Concurrent identical searches share one stream through _overpass_flight. Rendering starts early,
+    but memory is still O(results): the places of the streamed tiles are held until the stream ends,
+    when they are cached. Overpass errors are raised to the caller.
+    """
+    if cache is None:
+        cache = get_overpass_tile_cache()
+    missing = []
+    for tile in covering_tiles(lat, lon, radius):
+        cached = cache.get(f"z{OVERPASS_TILE_ZOOM}/{tile[0]}/{tile[1]}")
+        if cached is None:
+            missing.append(tile)
+        elif cached:
+            yield [Place(*values) for values in cached]
+    if not missing:
+        return
+    query = build_overpass_tiles_query(missing)
+    yield from _overpass_flight.stream(query, stream_osm_tiles, missing, query, url, cache, page_size)
+
+def stream_osm_tiles(tiles, query, url=OVERPASS_URL, cache=None, page_size=1000):
+    """
+    Streams the Overpass `query` for `tiles` and yields lists of up to `page_size` Place records as
+    the response arrives. The tiles are cached once the response is complete; a response Overpass
+    reports as failed raises before anything is cached.
+    """
+    if cache is None:
+        cache = get_overpass_tile_cache()
+    fetched = {tile: [] for tile in tiles}
+    page = []
+    for element in iter_overpass_elements(query, url):
+        if element.get('type') != 'node':
+            continue
+        place = place_from_osm_node(element['id'], element['lat'], element['lon'], element.get('tags', {}))
+        tile = lat_lon_to_tile(place.lat, place.lng)
+        if tile in fetched:
+            fetched[tile].append(place)
+            page.append(place)
+        if len(page) >= page_size:
+            yield page
+            page = []
+    if page:
+        yield page
+    store_osm_tiles(cache, fetched)
+
+# ============================
+# Distance Calculations
+# ============================
+
+EARTH_RADIUS_M = 6_371_008.8
+
+def haversine_distances(lat, lon, lats, lons):
+    """
+    Returns the great-circle distances in metres from (lat, lon) to every point of the `lats`/`lons` arrays.
+    """
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+def equirectangular_distances(lat, lon, lats, lons):
+    """
+    Approximate distances in metres using the equirectangular projection.
+    Cheaper than haversine and accurate to well under 0.1% at the few-kilometre scale of a radius search.
+    """
+    lat1 = np.radians(lat)
+    x = np.radians(np.asarray(lons) - lon) * np.cos((lat1 + np.radians(lats)) / 2)
+    y = np.radians(np.asarray(lats) - lat)
+    return EARTH_RADIUS_M * np.hypot(x, y)
+
+def radius_order(lat, lon, lats, lons, radius, approximate=False):
+    """
+    Returns (indices, distances) of the points within `radius` metres of (lat, lon), nearest first.
+    """
+    distance_fn = equirectangular_distances if approximate else haversine_distances
+    distances = distance_fn(lat, lon, np.asarray(lats, dtype=np.float64), np.asarray(lons, dtype=np.float64))
+    inside = np.flatnonzero(distances <= radius)
+    order = inside[np.argsort(distances[inside], kind="stable")]
+    return order, distances[order]
+
+def filter_places_by_distance(places, center, radius):
+    """
+    Keeps only the places within `radius` metres of `center`, sorted by distance,
+    with distance_m filled in. Accepts Place records or a PlaceArray and returns a PlaceArray.
+    """
+    places = as_place_array(places)
+    order, distances = radius_order(center[0], center[1], places.lat, places.lng, radius)
+    return places.take(order, distance_m=distances)
+
+# ============================
+# Postcode Table
+# ============================
+
+POSTCODE_TABLE_PATH = os.environ.get("ADDRESS_FINDER_POSTCODES", "greek_postcodes.npy")
+POSTCODE_BOX_MARGIN_DEG = 0.005  # slack around a postcode box before a geocode counts as outside it
+
+@dataclass
+class PostcodeBox:
+    """
+    Centroid and bounding box of one postcode.
+    """
+    centroid: tuple
+    south: float
+    west: float
+    north: float
+    east: float
+
+    def contains(self, coords, margin=POSTCODE_BOX_MARGIN_DEG):
+        lat, lng = coords
+        return self.south - margin <= lat <= self.north + margin and self.west - margin <= lng <= self.east + margin
+
+    def bounds(self):
+        """
+        Returns the box in the form the Geocoding API expects for its `bounds` bias.
+        """
+        return {"southwest": (self.south, self.west), "northeast": (self.north, self.east)}
+
+class PostcodeTable:
+    """
+    Centroids and bounding boxes of all five-digit postcodes, held in one dense float32 array
+    indexed directly by the postcode number, so a lookup is a single array access.
+    Columns: centroid lat, centroid lng, south, west, north, east (NaN for unknown postcodes).
+    """
+
+    def __init__(self, path=POSTCODE_TABLE_PATH):
+        self.table = np.load(path)
+
+    def lookup(self, postcode):
+        """
+        Returns the PostcodeBox for the postcode, or None if it is unknown.
+        """
+        row = self.table[int(postcode)]
+        if np.isnan(row[0]):
+            return None
+        return PostcodeBox((float(row[0]), float(row[1])), *map(float, row[2:]))
+
+def build_postcode_table(db_path=GAZETTEER_PATH, out_path=POSTCODE_TABLE_PATH):
+    """
+    Builds the postcode table from the address points of a local gazetteer database.
+    Returns the number of postcodes found.
+    """
+    table = np.full((100_000, 6), np.nan, dtype=np.float32)
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    rows = conn.execute(
+        "SELECT postcode, AVG(lat), AVG(lon), MIN(lat), MIN(lon), MAX(lat), MAX(lon) "
+        "FROM addresses WHERE postcode IS NOT NULL GROUP BY postcode"
+    ).fetchall()
+    conn.close()
+    for postcode, *values in rows:
+        table[int(postcode)] = values
+    np.save(out_path, table)
+    return len(rows)
+
+@st.cache_resource(show_spinner=False)
+def get_postcode_table(path=POSTCODE_TABLE_PATH):
+    """
+    Loads the postcode table once per process, or returns None if it has not been built.
+    """
+    return PostcodeTable(path) if os.path.exists(path) else None
+
+# ============================
+# Spatial Index
+# ============================
+
+POINT_INDEX_PATH = os.environ.get("ADDRESS_FINDER_POINT_INDEX", "address_points")
+POINT_INDEX_CELL_DEG = 0.005  # grid cell size in degrees (about 550 m north-south)
+
+def _point_cell_ids(lats, lons):
+    rows = np.floor((np.asarray(lats) + 90.0) / POINT_INDEX_CELL_DEG).astype(np.int64)
+    cols = np.floor((np.asarray(lons) + 180.0) / POINT_INDEX_CELL_DEG).astype(np.int64)
+    return (rows << 32) | cols
+
+def build_point_index(ids, lats, lons, labels, out_dir=POINT_INDEX_PATH):
+    """
+    Writes a spatial index over address points to `out_dir`.
+    Points are sorted by grid cell and stored as plain .npy arrays plus one UTF-8 label blob,
+    so AddressPointIndex can memory-map them and several processes share one copy in the page cache.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    cell_ids = _point_cell_ids(lats, lons)
+    order = np.argsort(cell_ids, kind="stable")
+    cells, starts = np.unique(cell_ids[order], return_index=True)
+    encoded = [labels[i].encode("utf-8") for i in order]
+    label_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(label) for label in encoded], out=label_offsets[1:])
+    os.makedirs(out_dir, exist_ok=True)
+    np.save(os.path.join(out_dir, "ids.npy"), ids[order])
+    np.save(os.path.join(out_dir, "lats.npy"), lats[order])
+    np.save(os.path.join(out_dir, "lons.npy"), lons[order])
+    np.save(os.path.join(out_dir, "cells.npy"), cells)
+    np.save(os.path.join(out_dir, "cell_starts.npy"), np.append(starts, len(order)).astype(np.int64))
+    np.save(os.path.join(out_dir, "label_offsets.npy"), label_offsets)
+    with open(os.path.join(out_dir, "labels.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+    return len(order)
+
+def build_point_index_from_gazetteer(db_path=GAZETTEER_PATH, out_dir=POINT_INDEX_PATH):
+    """
+    Builds the spatial index from the address points of a local gazetteer database.
+    Points keep their OSM node ids, so their place ids match those of Overpass results.
+    """
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("SELECT node_id, lat, lon, street, housenumber, city, postcode FROM addresses").fetchall()
+    except sqlite3.OperationalError as e:
+        raise RuntimeError(f"{db_path} was built without OSM node ids; rebuild it with build-gazetteer.") from e
+    finally:
+        conn.close()
+    labels = [
+        format_osm_address({'addr:street': street, 'addr:housenumber': housenumber, 'addr:city': city or '', 'addr:postcode': postcode or ''})
+        for _, _, _, street, housenumber, city, postcode in rows
+    ]
+    return build_point_index([r[0] for r in rows], [r[1] for r in rows], [r[2] for r in rows], labels, out_dir)
+
+class AddressPointIndex:
+    """
+    In-process radius search over address points written by build_point_index.
+    The arrays are memory-mapped read-only, so opening the index is instant and costs no private memory.
+    """
+
+    def __init__(self, index_dir=POINT_INDEX_PATH):
+        load = lambda name: np.load(os.path.join(index_dir, name), mmap_mode="r")
+        self.ids = load("ids.npy")
+        self.lats = load("lats.npy")
+        self.lons = load("lons.npy")
+        self.cells = load("cells.npy")
+        self.cell_starts = load("cell_starts.npy")
+        self.label_offsets = load("label_offsets.npy")
+        self.labels = np.memmap(os.path.join(index_dir, "labels.bin"), dtype=np.uint8, mode="r") if self.label_offsets[-1] else b""
+
+    def __len__(self):
+        return len(self.ids)
+
+    def label(self, i):
+        return bytes(self.labels[self.label_offsets[i]:self.label_offsets[i + 1]]).decode("utf-8")
+
+    def query_indices(self, lat, lon, radius):
+        """
+        Returns the positions of all points within `radius` metres of (lat, lon) and their distances,
+        nearest first.
+        """
+        dlat = radius / 111_320.0
+        dlon = radius / (111_320.0 * max(np.cos(np.radians(lat)), 1e-6))
+        low = int(_point_cell_ids(lat - dlat, lon - dlon))
+        high = int(_point_cell_ids(lat + dlat, lon + dlon))
+        col0, col1 = low & 0xFFFFFFFF, high & 0xFFFFFFFF
+        # Cells of one grid row are contiguous in the sorted cell array, so each row is a single slice
+        ranges = []
+        for row in range(low >> 32, (high >> 32) + 1):
+            first = np.searchsorted(self.cells, (row << 32) | col0, side="left")
+            last = np.searchsorted(self.cells, (row << 32) | col1, side="right")
+            if first < last:
+                ranges.append(np.arange(self.cell_starts[first], self.cell_starts[last]))
+        if not ranges:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        candidates = np.concatenate(ranges)
+        order, distances = radius_order(lat, lon, self.lats[candidates], self.lons[candidates], radius)
+        return candidates[order], distances
+
+    def query(self, lat, lon, radius):
+        """
+        Returns a PlaceArray of all address points within `radius` metres of (lat, lon), nearest first.
+        """
+        indices, distances = self.query_indices(lat, lon, radius)
+        count = len(indices)
+        # Neighbouring nodes often share a label; the string table must hold each one once
+        strings, intern = string_interner()
+        label_ids = np.fromiter((intern(self.label(i)) for i in indices.tolist()), dtype=np.int32, count=count)
+        place_id_ids = np.fromiter((intern(f"osm:node/{node_id}") for node_id in self.ids[indices].tolist()),
+                                   dtype=np.int32, count=count)
+        return PlaceArray(np.array(self.lats[indices]), np.array(self.lons[indices]), label_ids, label_ids,
+                          place_id_ids, strings, distances)
+
+@st.cache_resource(show_spinner=False)
+def get_point_index(index_dir=POINT_INDEX_PATH):
+    """
+    Opens the spatial index once per process.
+    """
+    return AddressPointIndex(index_dir)
+
+# ============================
+# Batch Geocoding
+# ============================
+
+class TokenBucket:
+    """
+    Thread-safe token bucket limiting calls to `rate` per second, with bursts of up to `capacity`.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until a token is available and consumes it.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+class RateLimitedClient:
+    """
+    Wraps a googlemaps.Client so that every geocode call first takes a token from `bucket`.
+    Cache hits never reach the client and therefore do not consume quota.
+    """
+
+    def __init__(self, gmaps_client, bucket):
+        self._client = gmaps_client
+        self._bucket = bucket
+
+    def geocode(self, *args, **kwargs):
+        self._bucket.acquire()
+        return self._client.geocode(*args, **kwargs)
+
+class BatchJournal:
+    """
+    Durable progress journal for long batch runs, stored in SQLite.
+    Each input row is recorded under a hash of its content as soon as it has been geocoded,
+    so a restarted run can skip rows that already completed and retry only the failed ones.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS rows ("
+            "row_hash TEXT PRIMARY KEY, lat REAL, lng REAL, error TEXT, failed INTEGER NOT NULL, updated REAL NOT NULL)"
+        )
+
+    @staticmethod
+    def row_hash(row):
+        """
+        Hashes an input row (a string or a JSON-serializable dict) into a journal key.
+        """
+        content = row if isinstance(row, str) else json.dumps(row, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+    def completed(self, row_hashes):
+        """
+        Returns {row_hash: (coords, error)} for the given rows that completed in an earlier run.
+        A row counts as completed when it was geocoded or definitively not found; failures are left out.
+        """
+        found = {}
+        row_hashes = list(row_hashes)
+        with self._lock:
+            for start in range(0, len(row_hashes), 500):
+                batch = row_hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for row_hash, lat, lng, error in self._conn.execute(
+                    f"SELECT row_hash, lat, lng, error FROM rows WHERE failed = 0 AND row_hash IN ({placeholders})", batch
+                ):
+                    found[row_hash] = ((lat, lng) if lat is not None else None, error)
+        return found
+
+    def record(self, row_hash, coords, error, failed):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO rows (row_hash, lat, lng, error, failed, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (row_hash, coords[0] if coords else None, coords[1] if coords else None, error, int(failed), time.time())
+            )
+
+    def close(self):
+        self._conn.close()
+
+def batch_geocode(addresses, gmaps_client, max_workers=8, qps=40, language='el', components=None,
+                  journal=None, row_keys=None, postcodes=None, bucket=None):
+    """
+    Geocodes many addresses concurrently on a bounded thread pool, at most `qps` API calls per second.
+    Returns one dict per input address, in input order, with keys 'address', 'coords' and 'error'.
+    A failing address is reported in its 'error' field and does not stop the batch.
+    When a BatchJournal is given, rows it already completed are returned without any call and every
+    new result is journaled as soon as it arrives. `row_keys` optionally supplies one journal key per
+    address (by default the address itself is hashed). `postcodes` optionally supplies one postcode
+    per address, added to that address's component filter. Callers that geocode in several batches
+    pass one TokenBucket as `bucket`, so that `qps` holds across the batches rather than within each.
+    """
+    client = RateLimitedClient(gmaps_client, bucket if bucket is not None else TokenBucket(qps))
+    cache = get_geocode_cache()
+    results = [None] * len(addresses)
+    pending = list(range(len(addresses)))
+    hashes = None
+    if journal is not None:
+        hashes = [BatchJournal.row_hash(key) for key in (row_keys if row_keys is not None else addresses)]
+        done = journal.completed(hashes)
+        for i, row_hash in enumerate(hashes):
+            if row_hash in done:
+                coords, error = done[row_hash]
+                results[i] = {"address": addresses[i], "coords": coords, "error": error}
+        pending = [i for i in pending if results[i] is None]
+
+    def geocode_one(address, postcode):
+        failed = False
+        item_components = components
+        if postcode:
+            item_components = {**(components or geocode_components()), "postal_code": postcode}
+        try:
+            coords = lookup_geocode(address, client, language=language, components=item_components, cache=cache)
+            error = None if coords else "Address not found"
+        except Exception as e:
+            coords, error, failed = None, str(e), True
+        return {"address": address, "coords": coords, "error": error}, failed
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(geocode_one, addresses[i], postcodes[i] if postcodes is not None else None): i for i in pending}
+        for future in as_completed(futures):
+            i = futures[future]
+            results[i], failed = future.result()
+            if journal is not None:
+                journal.record(hashes[i], results[i]["coords"], results[i]["error"], failed)
+    return results
+
+# ============================
+# Async Client
+# ============================
+
+GOOGLE_MAPS_BASE_URL = "https://maps.googleapis.com/maps/api"
+
+class AsyncMapsClient:
+    """
+    Asynchronous client for the Geocoding, Places Nearby Search and Overpass APIs.
+    All requests share one keep-alive connection pool. Each host is limited to
+    `per_host_limit` requests in flight, so one process can multiplex many lookups
+    without flooding any single API. The base URLs are configurable so requests
+    can be routed through a proxy or a local mock; `transport` replaces the network entirely
+    (e.g. an httpx.MockTransport).
+    Use it as an async context manager, or call aclose() when done.
+    """
+
+    def __init__(self, api_key, base_url=GOOGLE_MAPS_BASE_URL, overpass_url=OVERPASS_URL,
+                 max_connections=200, per_host_limit=50, timeout=10.0, transport=None):
+        if httpx is None:
+            raise RuntimeError("AsyncMapsClient requires the 'httpx' package.")
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.overpass_url = overpass_url
+        self.per_host_limit = per_host_limit
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=httpx.Timeout(timeout),
+            transport=transport
+        )
+        self._host_semaphores = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    async def _request(self, method, url, **kwargs):
+        host = httpx.URL(url).host
+        semaphore = self._host_semaphores.setdefault(host, asyncio.Semaphore(self.per_host_limit))
+        async with semaphore:
+            response = await self._http.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    async def _google(self, endpoint, params):
+        body = await self._request("GET", f"{self.base_url}/{endpoint}/json", params={**params, "key": self.api_key})
+        status = body.get("status")
+        if status not in ("OK", "ZERO_RESULTS"):
+            raise googlemaps.exceptions.ApiError(status, body.get("error_message"))
+        return body
+
+    async def geocode(self, address, language='el', components=None):
+        """
+        Returns the list of Geocoding API results for `address`.
+        """
+        params = {"address": address, "language": language}
+        if components:
+            params["components"] = "|".join(f"{k}:{v}" for k, v in components.items())
+        body = await self._google("geocode", params)
+        return body.get("results", [])
+
+    async def places_nearby(self, location=None, radius=None, page_token=None):
+        """
+        Returns one raw Places Nearby Search response, either the first page around
+        `location` or the page identified by `page_token`.
+        """
+        if page_token:
+            params = {"pagetoken": page_token}
+        else:
+            params = {"location": f"{location[0]},{location[1]}", "radius": radius}
+        return await self._google("place/nearbysearch", params)
+
+    async def overpass(self, query):
+        """
+        Runs an Overpass QL query and returns the decoded JSON response.
+        Runtime errors that Overpass reports in the response's remark are raised.
+        """
+        body = await self._request("POST", self.overpass_url, data={"data": query})
+        check_overpass_document(body)
+        return body
+
+async def geocode_address_async(address, client, language='el', components=None, cache=None):
+    """
+    Async counterpart of lookup_geocode using an AsyncMapsClient, with the same answers: it shares the
+    persistent geocode cache and retries without the postcode when a postcode filter finds nothing.
+    The SQLite cache is blocking, so it is read and written on a worker thread to keep the event loop free.
+    """
+    if components is None:
+        components = {"country": "GR"}
+    if cache is None:
+        cache = get_geocode_cache()
+    key = geocode_cache_key(address, language, components)
+    cached = await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        return tuple(cached)
+    geocode_result = await client.geocode(address, language=language, components=components)
+    if not geocode_result:
+        if "postal_code" in components:
+            # A mistyped postcode filters out every match; retry on the country alone
+            relaxed = {k: v for k, v in components.items() if k != "postal_code"}
+            return await geocode_address_async(address, client, language=language, components=relaxed, cache=cache)
+        return None
+    location = geocode_result[0]['geometry']['location']
+    coords = (location['lat'], location['lng'])
+    await asyncio.to_thread(cache.set, key, coords)
+    return coords
+
+async def fetch_places_page_async(client, location, radius, page_token=None):
+    """
+    Async counterpart of fetch_places_page.
+    """
+    if page_token is None:
+        return await client.places_nearby(location=location, radius=radius)
+    deadline = time.monotonic() + PLACES_PAGE_TOKEN_TIMEOUT
+    while True:
+        try:
+            return await client.places_nearby(page_token=page_token)
+        except googlemaps.exceptions.ApiError as e:
+            if e.status != "INVALID_REQUEST" or time.monotonic() >= deadline:
+                raise
+            await asyncio.sleep(PLACES_PAGE_TOKEN_POLL_INTERVAL)
+
+async def fetch_nearby_places_async(client, location, radius=500):
+    """
+    Async generator over nearby Place records. Like fetch_nearby_place_pages,
+    the next page is requested while the current one is being consumed.
+    Places search can return results outside the radius, so like run_search each page is
+    filtered to `radius` metres and sorted by distance, with distance_m filled in.
+    """
+    pending = asyncio.ensure_future(fetch_places_page_async(client, location, radius))
+    try:
+        while pending is not None:
+            response = await pending
+            page_token = response.get('next_page_token')
+            pending = asyncio.ensure_future(fetch_places_page_async(client, location, radius, page_token)) if page_token else None
+            places = [place_from_google_result(result) for result in response.get('results', [])]
+            for place in filter_places_by_distance([place for place in places if place is not None], location, radius):
+                yield place
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+async def fetch_osm_addresses_async(client, lat, lon, radius=500):
+    """
+    Async counterpart of fetch_osm_addresses_overpy.
+    """
+    result = await client.overpass(build_overpass_query(lat, lon, radius))
+    places = [
+        place_from_osm_node(element['id'], element['lat'], element['lon'], element.get('tags', {}))
+        for element in result.get('elements', []) if element.get('type') == 'node'
+    ]
+    return dedup_places(filter_places_by_distance(places, (lat, lon), radius))
+
+# ============================
+# Command Line Interface
+# ============================
+
+BATCH_OUTPUT_FIELDS = [("lat", "float64"), ("lng", "float64"), ("geocode_error", "string"), ("postcode", "string"),
+                       ("nearby_count", "int64"), ("nearest_address", "string")]
+
+def open_batch_input(input_path, chunk_size):
+    """
+    Opens a CSV or Parquet file for streaming.
+    Returns (columns, chunks): the input column names and a generator of lists of row dicts,
+    so only one chunk is held in memory at a time.
+    """
+    if input_path.endswith(".parquet"):
+        if pq is None:
+            raise RuntimeError("Parquet input requires the 'pyarrow' package.")
+        parquet_file = pq.ParquetFile(input_path)
+        columns = parquet_file.schema_arrow.names
+        chunks = (batch.to_pylist() for batch in parquet_file.iter_batches(batch_size=chunk_size))
+        return columns, chunks
+
+    def read_csv_chunks():
+        with open(input_path, newline="", encoding="utf-8") as f:
+            chunk = []
+            for row in csv.DictReader(f):
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    with open(input_path, newline="", encoding="utf-8") as f:
+        columns = next(csv.reader(f), [])
+    return columns, read_csv_chunks()
+
+class BatchWriter:
+    """
+    Appends result rows to a CSV or Parquet file chunk by chunk.
+    """
+
+    def __init__(self, output_path, columns):
+        output_types = dict(BATCH_OUTPUT_FIELDS)
+        self.columns = list(columns) + [name for name in output_types if name not in columns]
+        # Parquet output stores the input columns as strings so every chunk shares one schema
+        self._input_columns = [name for name in self.columns if name not in output_types]
+        if output_path.endswith(".parquet"):
+            if pq is None:
+                raise RuntimeError("Parquet output requires the 'pyarrow' package.")
+            self._schema = pa.schema([(name, output_types.get(name, "string")) for name in self.columns])
+            self._parquet = pq.ParquetWriter(output_path, self._schema)
+        else:
+            self._parquet = None
+            self._file = open(output_path, "w", newline="", encoding="utf-8")
+            self._csv = csv.DictWriter(self._file, fieldnames=self.columns)
+            self._csv.writeheader()
+
+    def write(self, rows):
+        if self._parquet is not None:
+            for row in rows:
+                for name in self._input_columns:
+                    if row.get(name) is not None:
+                        row[name] = str(row[name])
+            self._parquet.write_table(pa.Table.from_pylist(rows, schema=self._schema))
+        else:
+            self._csv.writerows(rows)
+            self._file.flush()
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+        else:
+            self._file.close()
+
+def run_batch(input_path, output_path, gmaps_client, address_column="address", chunk_size=1000,
+              max_workers=8, qps=40, point_index=None, nearby_radius=500, journal=None):
+    """
+    Streams the addresses in `input_path` through the geocoder and writes enriched rows to `output_path`.
+    Each chunk is geocoded concurrently with batch_geocode and written before the next one is read,
+    so memory stays flat regardless of input size. When a local point index is given, each row is
+    also enriched with the number of addresses within `nearby_radius` metres and the nearest one.
+    With a BatchJournal, a rerun after a crash skips every row that already completed and
+    only retries the ones that failed.
+    Returns the number of rows written.
+    """
+    columns, chunks = open_batch_input(input_path, chunk_size)
+    if address_column not in columns:
+        raise ValueError(f"Input has no '{address_column}' column (columns: {', '.join(columns)})")
+    writer = BatchWriter(output_path, columns)
+    # One bucket for the whole run; a bucket per chunk would start every chunk with a full burst
+    bucket = TokenBucket(qps)
+    count = 0
+    try:
+        for chunk in chunks:
+            addresses = [row.get(address_column) or "" for row in chunk]
+            postcodes = extract_postcodes(addresses)
+            postcodes = postcodes.astype(object).where(postcodes.notna(), None).tolist()
+            results = batch_geocode(addresses, gmaps_client, max_workers=max_workers, qps=qps, bucket=bucket,
+                                    journal=journal, row_keys=chunk if journal is not None else None, postcodes=postcodes)
+            for row, result, postcode in zip(chunk, results, postcodes):
+                coords = result["coords"]
+                row["lat"], row["lng"] = coords if coords else (None, None)
+                row["geocode_error"] = result["error"]
+                row["postcode"] = postcode
+                if point_index is not None and coords:
+                    indices, _ = point_index.query_indices(coords[0], coords[1], nearby_radius)
+                    row["nearby_count"] = len(indices)
+                    row["nearest_address"] = point_index.label(indices[0]) if len(indices) else None
+            writer.write(chunk)
+            count += len(chunk)
+            print(f"Processed {count} rows", file=sys.stderr)
+    finally:
+        writer.close()
+    return count
+
+def run_cli(argv):
+    """
+    Entry point for the headless commands: batch and the builders of the local data files.
+    """
+    parser = argparse.ArgumentParser(prog="adress.finder.py", description="Address finder batch tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    batch = commands.add_parser("batch", help="Geocode and enrich a CSV or Parquet file of addresses.")
+    batch.add_argument("input", help="Input .csv or .parquet file")
+    batch.add_argument("output", help="Output .csv or .parquet file")
+    batch.add_argument("--api-key", default=os.environ.get("GOOGLE_MAPS_API_KEY"), help="Google Maps API key (default: $GOOGLE_MAPS_API_KEY)")
+    batch.add_argument("--address-column", default="address")
+    batch.add_argument("--chunk-size", type=int, default=1000)
+    batch.add_argument("--workers", type=int, default=8)
+    batch.add_argument("--qps", type=float, default=40)
+    batch.add_argument("--point-index", help="Directory of a local point index used to add nearby address counts")
+    batch.add_argument("--nearby-radius", type=float, default=500)
+    batch.add_argument("--journal", help="Progress journal used to resume an interrupted run (default: <output>.journal)")
+    batch.add_argument("--no-journal", action="store_true", help="Do not record or resume progress")
+
+    gazetteer = commands.add_parser("build-gazetteer", help="Build the local gazetteer from an OSM extract.")
+    gazetteer.add_argument("osm_path")
+    gazetteer.add_argument("db_path", nargs="?", default=GAZETTEER_PATH)
+
+    point_index = commands.add_parser("build-point-index", help="Build the spatial index from a local gazetteer.")
+    point_index.add_argument("db_path", nargs="?", default=GAZETTEER_PATH)
+    point_index.add_argument("index_dir", nargs="?", default=POINT_INDEX_PATH)
+
+    postcodes = commands.add_parser("build-postcode-table", help="Build the postcode centroid table from a local gazetteer.")
+    postcodes.add_argument("db_path", nargs="?", default=GAZETTEER_PATH)
+    postcodes.add_argument("out_path", nargs="?", default=POSTCODE_TABLE_PATH)
+
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        if not args.api_key:
+            parser.error("a Google Maps API key is required (--api-key or $GOOGLE_MAPS_API_KEY)")
+        journal = None if args.no_journal else BatchJournal(args.journal or f"{args.output}.journal")
+        try:
+            count = run_batch(
+                args.input, args.output, googlemaps.Client(key=args.api_key),
+                address_column=args.address_column, chunk_size=args.chunk_size, max_workers=args.workers, qps=args.qps,
+                point_index=AddressPointIndex(args.point_index) if args.point_index else None,
+                nearby_radius=args.nearby_radius, journal=journal
+            )
+        finally:
+            if journal is not None:
+                journal.close()
+        print(f"Wrote {count} rows to {args.output}")
+    elif args.command == "build-gazetteer":
+        print(f"Indexed {build_gazetteer(args.osm_path, args.db_path)} addresses into {args.db_path}")
+    elif args.command == "build-point-index":
+        print(f"Indexed {build_point_index_from_gazetteer(args.db_path, args.index_dir)} points into {args.index_dir}")
+    elif args.command == "build-postcode-table":
+        print(f"Wrote {build_postcode_table(args.db_path, args.out_path)} postcodes to {args.out_path}")
+
+CLI_COMMANDS = ("batch", "build-gazetteer", "build-point-index", "build-postcode-table")
 
 # ============================
 # Run the Application
 # ============================
 
 if __name__ == "__main__":
-    main()
+    # `python adress.finder.py batch ...` runs headless; `streamlit run adress.finder.py` starts the app
+    if len(sys.argv) > 1 and sys.argv[1] in CLI_COMMANDS:
+        run_cli(sys.argv[1:])
+    else:
+        main()
\ No newline at end of file
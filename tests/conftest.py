@@ -0,0 +1,25 @@
+import importlib.util
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Keep the persistent caches of the module out of the working tree
+os.environ.setdefault("ADDRESS_FINDER_CACHE", os.path.join(tempfile.mkdtemp(), "address_finder_cache.sqlite"))
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "adress.finder.py")
+
+def _load_app():
+    # The file name has a dot in it, so it cannot be imported by name
+    spec = importlib.util.spec_from_file_location("adress_finder", APP_PATH)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+_app = _load_app()
+
+@pytest.fixture
+def app():
+    return _app
@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import pytest
+
+httpx = pytest.importorskip("httpx")
+
+CENTER = (37.98, 23.73)
+
+
+def google_result(name, lat, lng, place_id):
+    return {"name": name, "vicinity": f"{name}, Athens", "place_id": place_id, "geometry": {"location": {"lat": lat, "lng": lng}}}
+
+
+class FakeAPIs:
+    """
+    Serves canned Geocoding, Places and Overpass responses through an httpx.MockTransport.
+    """
+
+    def __init__(self):
+        self.requests = []
+        self.token_attempts = 0
+        self.overpass_body = {"elements": []}
+
+    def handle(self, request):
+        self.requests.append(request)
+        params = dict(request.url.params)
+        if request.url.host == "overpass.test":
+            return httpx.Response(200, json=self.overpass_body)
+        if request.url.path.endswith("/geocode/json"):
+            if "postal_code" in params.get("components", ""):
+                return httpx.Response(200, json={"status": "ZERO_RESULTS", "results": []})
+            return httpx.Response(200, json={"status": "OK", "results": [{"geometry": {"location": {"lat": 37.9, "lng": 23.7}}}]})
+        if request.url.path.endswith("/place/nearbysearch/json"):
+            if "pagetoken" not in params:
+                return httpx.Response(200, json={"status": "OK", "next_page_token": "token-2", "results": [
+                    google_result("Far", CENTER[0] + 0.01, CENTER[1], "far"),
+                    google_result("Near", CENTER[0] + 0.001, CENTER[1], "near"),
+                ]})
+            self.token_attempts += 1
+            if self.token_attempts == 1:
+                # A fresh token is rejected until Google activates it
+                return httpx.Response(200, json={"status": "INVALID_REQUEST"})
+            return httpx.Response(200, json={"status": "OK", "results": [google_result("Nearest", CENTER[0] + 0.0001, CENTER[1], "nearest")]})
+        return httpx.Response(404)
+
+
+@pytest.fixture
+def apis():
+    return FakeAPIs()
+
+
+def run(app, apis, coroutine_function):
+    async def main():
+        async with app.AsyncMapsClient("KEY", overpass_url="https://overpass.test/api/interpreter",
+                                       transport=httpx.MockTransport(apis.handle)) as client:
+            return await coroutine_function(client)
+    return asyncio.run(main())
+
+
+def test_geocode_retries_without_postcode_and_caches(app, apis, tmp_path):
+    cache = app.SQLiteCache(str(tmp_path / "geocode.sqlite"), table="geocode")
+    components = app.geocode_components("99999")
+
+    async def geocode_twice(client):
+        first = await app.geocode_address_async("Odos 1, 99999", client, components=components, cache=cache)
+        second = await app.geocode_address_async("Odos 1, 99999", client, components=components, cache=cache)
+        return first, second
+
+    assert run(app, apis, geocode_twice) == ((37.9, 23.7), (37.9, 23.7))
+    # Like lookup_geocode, empty filtered answers are not cached but the country-only retry is
+    filtered = ["postal_code" in request.url.params["components"] for request in apis.requests]
+    assert filtered == [True, False, True]
+    assert all(request.url.params["key"] == "KEY" for request in apis.requests)
+
+
+def test_geocode_cache_hit_skips_request(app, apis, tmp_path):
+    cache = app.SQLiteCache(str(tmp_path / "geocode.sqlite"), table="geocode")
+    cache.set(app.geocode_cache_key("Odos 1", "el", {"country": "GR"}), (1.0, 2.0))
+    coords = run(app, apis, lambda client: app.geocode_address_async("Odos 1", client, cache=cache))
+    assert coords == (1.0, 2.0)
+    assert apis.requests == []
+
+
+def test_nearby_places_follow_page_token_and_filter_radius(app, apis, monkeypatch):
+    monkeypatch.setattr(app, "PLACES_PAGE_TOKEN_POLL_INTERVAL", 0.01)
+
+    async def collect(client):
+        return [place async for place in app.fetch_nearby_places_async(client, CENTER, 500)]
+
+    places = run(app, apis, collect)
+    assert [place.place_id for place in places] == ["near", "nearest"]
+    assert all(place.distance_m is not None and place.distance_m <= 500 for place in places)
+    assert apis.token_attempts == 2
+
+
+def test_osm_addresses(app, apis):
+    apis.overpass_body = {"elements": [
+        {"type": "node", "id": 1, "lat": CENTER[0] + 0.001, "lon": CENTER[1], "tags": {"addr:street": "Ερμού", "addr:housenumber": "10"}},
+        {"type": "node", "id": 2, "lat": CENTER[0] + 0.00101, "lon": CENTER[1], "tags": {"addr:street": "Ερμού", "addr:housenumber": "10"}},
+        {"type": "node", "id": 3, "lat": CENTER[0] + 0.02, "lon": CENTER[1], "tags": {"addr:street": "Ερμού", "addr:housenumber": "12"}},
+    ]}
+    places = run(app, apis, lambda client: app.fetch_osm_addresses_async(client, CENTER[0], CENTER[1], 500))
+    assert [place.place_id for place in places] == ["osm:node/1"]
+    assert b"around:500" in apis.requests[0].content.replace(b"%3A", b":")
+
+
+def test_osm_runtime_error_raises(app, apis):
+    apis.overpass_body = {"elements": [], "remark": "runtime error: Query ran out of memory."}
+    with pytest.raises(app.overpy.exception.OverpassRuntimeError):
+        run(app, apis, lambda client: app.fetch_osm_addresses_async(client, CENTER[0], CENTER[1], 500))
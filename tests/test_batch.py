@@ -0,0 +1,84 @@
+import csv
+import threading
+import time
+import uuid
+
+import pytest
+
+
+class RecordingClient:
+    """
+    Fake googlemaps.Client recording when and for what each geocode call was made.
+    """
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def geocode(self, address, **options):
+        with self._lock:
+            self.calls.append((time.monotonic(), address))
+        if address in self.fail:
+            raise RuntimeError("OVER_QUERY_LIMIT")
+        return [{"geometry": {"location": {"lat": 37.9, "lng": 23.7}}}]
+
+
+def write_csv(path, addresses):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=["id", "address"])
+        writer.writeheader()
+        for i, address in enumerate(addresses):
+            writer.writerow({"id": i, "address": address})
+
+
+def read_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def unique_addresses(count):
+    # Fresh addresses every run, so the shared geocode cache never answers for the client
+    run = uuid.uuid4().hex[:8]
+    return [f"Odos {run} {i}" for i in range(count)]
+
+
+def test_run_batch_limits_rate_across_chunks(app, tmp_path):
+    addresses = unique_addresses(30)
+    write_csv(tmp_path / "in.csv", addresses)
+    client = RecordingClient()
+    app.run_batch(str(tmp_path / "in.csv"), str(tmp_path / "out.csv"), client, chunk_size=5, qps=20, max_workers=4)
+    assert len(client.calls) == 30
+    # A burst of up to `qps` calls, then the rest at `qps` per second; one bucket per chunk would take ~0 s
+    elapsed = client.calls[-1][0] - client.calls[0][0]
+    assert elapsed >= (30 - 20) / 20 * 0.9
+
+
+def test_batch_geocode_shares_bucket(app):
+    bucket = app.TokenBucket(10)
+    client = RecordingClient()
+    start = time.monotonic()
+    for _ in range(3):
+        app.batch_geocode(unique_addresses(5), client, bucket=bucket)
+    assert time.monotonic() - start >= (15 - 10) / 10 * 0.9
+
+
+def test_run_batch_resumes_from_journal(app, tmp_path, monkeypatch):
+    addresses = unique_addresses(12)
+    write_csv(tmp_path / "in.csv", addresses)
+    journal = app.BatchJournal(str(tmp_path / "out.csv.journal"))
+    first = RecordingClient(fail={addresses[7]})
+    app.run_batch(str(tmp_path / "in.csv"), str(tmp_path / "out.csv"), first, chunk_size=5, journal=journal)
+    rows = read_csv(tmp_path / "out.csv")
+    assert [row["geocode_error"] for row in rows if row["geocode_error"]] == ["OVER_QUERY_LIMIT"]
+
+    # An empty geocode cache for the rerun, so only the journal can account for the skipped rows
+    fresh_cache = app.SQLiteCache(str(tmp_path / "fresh.sqlite"), table="geocode")
+    monkeypatch.setattr(app, "get_geocode_cache", lambda: fresh_cache)
+    second = RecordingClient()
+    app.run_batch(str(tmp_path / "in.csv"), str(tmp_path / "out.csv"), second, chunk_size=5, journal=journal)
+    journal.close()
+    assert [address for _, address in second.calls] == [addresses[7]]
+    rows = read_csv(tmp_path / "out.csv")
+    assert [row["address"] for row in rows] == addresses
+    assert all(row["lat"] and not row["geocode_error"] for row in rows)
@@ -0,0 +1,41 @@
+def place(app, address, lat, lng=23.73):
+    return app.Place(name=address, address=address, lat=lat, lng=lng)
+
+
+def test_dedup_merges_same_address_nearby(app):
+    places = [place(app, "Ερμού 10, Αθήνα", 37.9760), place(app, "Ermou 10", 37.97605)]
+    result = app.dedup_places(places)
+    assert [p.address for p in result] == ["Ερμού 10, Αθήνα"]
+
+
+def test_dedup_keeps_same_address_far_apart(app):
+    # The same street and number in two towns are different addresses
+    places = [place(app, "Ερμού 10, Αθήνα", 37.9760), place(app, "Ερμού 10, Πειραιάς", 37.9400)]
+    assert len(app.dedup_places(places)) == 2
+
+
+def test_dedup_keeps_different_addresses(app):
+    places = [place(app, "Ερμού 10", 37.9760), place(app, "Ερμού 12", 37.9760)]
+    assert len(app.dedup_places(places)) == 2
+
+
+def test_dedup_keeps_first_of_each_group(app):
+    places = [
+        place(app, "Ερμού 10", 37.9760),
+        place(app, "Σταδίου 5", 37.9800),
+        place(app, "Ermou 10", 37.97601),
+    ]
+    assert [p.address for p in app.dedup_places(places)] == ["Ερμού 10", "Σταδίου 5"]
+
+
+def test_dedup_key_cache_gives_same_result(app):
+    places = [place(app, "Ερμού 10", 37.9760), place(app, "Ermou 10", 37.97601), place(app, "Σταδίου 5", 37.98)]
+    key_cache = {}
+    first = app.dedup_places(places, key_cache=key_cache)
+    second = app.dedup_places(places, key_cache=key_cache)
+    assert [p.address for p in first] == [p.address for p in second] == ["Ερμού 10", "Σταδίου 5"]
+    assert key_cache
+
+
+def test_dedup_empty(app):
+    assert len(app.dedup_places([])) == 0
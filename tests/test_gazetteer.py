@@ -0,0 +1,53 @@
+import pytest
+
+OSM_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="1" lat="38.0100" lon="23.7700">
+    <tag k="addr:street" v="Παπαφλέσσα"/><tag k="addr:housenumber" v="145"/>
+    <tag k="addr:city" v="Αθήνα"/><tag k="addr:postcode" v="185 46"/>
+  </node>
+  <node id="2" lat="37.9400" lon="23.6500">
+    <tag k="addr:street" v="Παπαφλέσσα"/><tag k="addr:housenumber" v="145"/>
+    <tag k="addr:city" v="Πειραιάς"/><tag k="addr:postcode" v="18535"/>
+  </node>
+  <node id="3" lat="37.9760" lon="23.7300"><tag k="amenity" v="cafe"/></node>
+  <way id="4"><nd ref="1"/><tag k="addr:street" v="Ερμού"/><tag k="addr:housenumber" v="10"/></way>
+</osm>
+"""
+
+
+@pytest.fixture
+def gazetteer(app, tmp_path):
+    osm_path = tmp_path / "extract.osm"
+    osm_path.write_text(OSM_XML, encoding="utf-8")
+    db_path = str(tmp_path / "gazetteer.sqlite")
+    assert app.build_gazetteer(str(osm_path), db_path) == 2
+    return app.LocalGazetteer(db_path)
+
+
+def test_iter_osm_address_nodes_reads_address_nodes_only(app, tmp_path):
+    osm_path = tmp_path / "extract.osm"
+    osm_path.write_text(OSM_XML, encoding="utf-8")
+    nodes = list(app.iter_osm_address_nodes(str(osm_path)))
+    assert [(node_id, lat, lon) for node_id, lat, lon, _ in nodes] == [(1, 38.01, 23.77), (2, 37.94, 23.65)]
+    assert nodes[0][3]["addr:street"] == "Παπαφλέσσα"
+
+
+@pytest.mark.parametrize("address", [
+    "Παπαφλέσσα 145, Αθήνα, 18546",
+    "Παπαφλέσσα 145, Αθήνα, 185 46",
+    "Παπαφλέσσα 145 Αθήνα 18546",
+    "Παπαφλέσσα 145 Αθήνα 185 46",
+    "Papaflessa 145 18546",
+])
+def test_geocode_prefers_postcode(gazetteer, address):
+    assert gazetteer.geocode(address) == (38.01, 23.77)
+
+
+def test_geocode_other_postcode(gazetteer):
+    assert gazetteer.geocode("Παπαφλέσσα 145 Πειραιάς 18535") == (37.94, 23.65)
+
+
+def test_geocode_unknown_address(gazetteer):
+    assert gazetteer.geocode("Παπαφλέσσα 147 Αθήνα 18546") is None
+    assert gazetteer.geocode("") is None
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+
+class FakeClient:
+    def __init__(self, delay=0.0, error=None):
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.release = threading.Event()
+
+    def geocode(self, address, **options):
+        self.calls += 1
+        if self.delay:
+            self.release.wait(self.delay)
+        if self.error:
+            raise self.error
+        return [{"geometry": {"location": {"lat": 37.99, "lng": 23.74}}}]
+
+
+class FakePostcodeTable:
+    def __init__(self, box):
+        self.box = box
+
+    def lookup(self, postcode):
+        return self.box if postcode == "18546" else None
+
+
+@pytest.fixture
+def cache(app, tmp_path):
+    return app.SQLiteCache(str(tmp_path / "geocode.sqlite"), table="geocode")
+
+
+@pytest.fixture
+def table(app):
+    return FakePostcodeTable(app.PostcodeBox((37.95, 23.65), 37.94, 23.64, 37.96, 23.66))
+
+
+def test_geocode_address_uses_api_result(app, cache, table):
+    client = FakeClient()
+    coords = app.geocode_address("Odos 1, 18546", client, components=app.geocode_components("18546"),
+                                 cache=cache, postcode_table=table)
+    assert coords == (37.99, 23.74)
+
+
+def test_geocode_address_falls_back_when_api_is_slow(app, cache, table):
+    client = FakeClient(delay=5)
+    coords = app.geocode_address("Odos 1, 18546", client, components=app.geocode_components("18546"),
+                                 cache=cache, postcode_table=table, deadline=0.05)
+    client.release.set()
+    assert coords == (37.95, 23.65)
+
+
+def test_geocode_address_falls_back_on_error(app, cache, table):
+    client = FakeClient(error=RuntimeError("boom"))
+    coords = app.geocode_address("Odos 1, 18546", client, components=app.geocode_components("18546"),
+                                 cache=cache, postcode_table=table)
+    assert coords == (37.95, 23.65)
+
+
+def test_geocode_address_without_postcode_box(app, cache):
+    client = FakeClient(error=RuntimeError("boom"))
+    assert app.geocode_address("Odos 1", client, components=app.geocode_components(), cache=cache) is None
+
+
+def test_request_denied_drops_only_the_failing_key(app, cache, monkeypatch):
+    calls = []
+
+    @app.st.cache_resource(show_spinner=False)
+    def get_client(api_key):
+        calls.append(api_key)
+        client = FakeClient(error=app.googlemaps.exceptions.ApiError("REQUEST_DENIED"))
+        client.key = api_key
+        return client
+
+    monkeypatch.setattr(app, "get_gmaps_client", get_client)
+    failing = get_client("KEY-A")
+    get_client("KEY-B")
+    assert app.geocode_address("Odos 1", failing, cache=cache) is None
+    get_client("KEY-A")
+    get_client("KEY-B")
+    # Only the denied key is validated again; the other stays cached
+    assert calls == ["KEY-A", "KEY-B", "KEY-A"]
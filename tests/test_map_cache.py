@@ -0,0 +1,39 @@
+import os
+
+
+def test_memory_tier_is_lru(app):
+    cache = app.MapHTMLCache(max_entries=2, directory=None)
+    cache.set("a", "A")
+    cache.set("b", "B")
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+
+
+def test_disk_tier_survives_a_new_instance(app, tmp_path):
+    app.MapHTMLCache(directory=str(tmp_path)).set("key", "<html>map</html>")
+    assert app.MapHTMLCache(directory=str(tmp_path)).get("key") == "<html>map</html>"
+
+
+def test_disk_tier_removes_least_recently_used(app, tmp_path):
+    cache = app.MapHTMLCache(max_entries=1, directory=str(tmp_path), max_bytes=250)
+    for i, key in enumerate(["old", "used", "new"]):
+        cache.set(key, "x" * 100)
+        os.utime(tmp_path / f"{key}.html", (1000 + i, 1000 + i))
+    # Reading a file from disk marks it as recently used
+    assert cache.get("old") == "x" * 100
+    cache._evict()
+    assert sorted(os.listdir(tmp_path)) == ["new.html", "old.html"]
+
+
+def test_render_map_html_is_cached(app, monkeypatch):
+    cache = app.MapHTMLCache(directory=None)
+    places = [app.Place("Ερμού 10", "Ερμού 10", 37.976, 23.73)]
+    first = app.render_map_html("Ερμού 1", (37.976, 23.73), places, 500, tiles="OpenStreetMap", cache=cache)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the map should have been served from the cache")
+
+    monkeypatch.setattr(app, "generate_folium_map_google_places", fail)
+    assert app.render_map_html("Ερμού 1", (37.976, 23.73), places, 500, tiles="OpenStreetMap", cache=cache) == first
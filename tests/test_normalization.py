@@ -0,0 +1,26 @@
+import pytest
+
+
+@pytest.mark.parametrize("address", [
+    "Παπαφλέσσα 145, Αθήνα, 18546",
+    "ΠΑΠΑΦΛΕΣΣΑ 145 ΑΘΗΝΑ 185 46",
+    "papaflessa 145, athina, 18546",
+])
+def test_normalize_address_folds_spellings(app, address):
+    assert app.normalize_address(address) == "papaflesa 145 athina 18546"
+
+
+@pytest.mark.parametrize("greek, greeklish", [
+    ("Ερμού 10", "Ermou 10"),
+    ("Ευαγγελιστρίας 3", "Evaggelistrias 3"),
+])
+def test_normalize_address_greek_matches_greeklish(app, greek, greeklish):
+    assert app.normalize_address(greek) == app.normalize_address(greeklish)
+
+
+def test_normalize_address_distinguishes_numbers(app):
+    assert app.normalize_address("Ερμού 10") != app.normalize_address("Ερμού 12")
+
+
+def test_address_key_ignores_token_order(app):
+    assert app.address_key("145 Παπαφλέσσα") == app.address_key("Παπαφλέσσα 145")
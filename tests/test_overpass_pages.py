@@ -0,0 +1,60 @@
+import pytest
+
+CENTER = (37.98, 23.73)
+
+
+@pytest.fixture
+def tile_cache(app, tmp_path):
+    return app.SQLiteCache(str(tmp_path / "tiles.sqlite"), table="overpass_tiles")
+
+
+def cache_places(app, cache, places, radius):
+    tiles = {tile: [] for tile in app.covering_tiles(CENTER[0], CENTER[1], radius)}
+    for place in places:
+        tiles[app.lat_lon_to_tile(place.lat, place.lng)].append(place)
+    app.store_osm_tiles(cache, tiles)
+
+
+def test_pages_keep_same_address_at_different_places(app, tile_cache):
+    # The far node comes first in stream order; merging by address alone would drop the near one
+    far = app.Place("12 Odos", "12 Odos", CENTER[0] + 0.004, CENTER[1], "osm:node/1")
+    near = app.Place("12 Odos", "12 Odos", CENTER[0] + 0.00008, CENTER[1], "osm:node/2")
+    cache_places(app, tile_cache, [far, near], 500)
+    pages = app.iter_osm_address_pages(CENTER[0], CENTER[1], 500, cache=tile_cache)
+    places = app.PlaceArray.concat([app.as_place_array(page) for page in pages])
+    result = app.dedup_places(app.filter_places_by_distance(places, CENTER, 500))
+    assert [p.place_id for p in result] == ["osm:node/2", "osm:node/1"]
+
+
+def test_pages_leave_merging_to_dedup(app, tile_cache):
+    first = app.Place("12 Odos", "12 Odos", CENTER[0] + 0.00008, CENTER[1], "osm:node/1")
+    second = app.Place("12 Odos", "12 Odos", CENTER[0] + 0.00010, CENTER[1], "osm:node/2")
+    cache_places(app, tile_cache, [first, second], 500)
+    pages = list(app.iter_osm_address_pages(CENTER[0], CENTER[1], 500, cache=tile_cache))
+    assert sum(len(page) for page in pages) == 2
+    places = app.filter_places_by_distance(app.PlaceArray.concat([app.as_place_array(page) for page in pages]), CENTER, 500)
+    assert [p.place_id for p in app.dedup_places(places)] == ["osm:node/1"]
+
+
+def test_streamed_tiles_are_paged_and_cached(app, tile_cache, monkeypatch):
+    tiles = app.covering_tiles(CENTER[0], CENTER[1], 500)
+    elements = [
+        {"type": "node", "id": i, "lat": CENTER[0] + i * 1e-5, "lon": CENTER[1],
+         "tags": {"addr:street": "Odos", "addr:housenumber": str(i)}}
+        for i in range(5)
+    ]
+    queries = []
+
+    def fake_elements(query, url=None, timeout=90):
+        queries.append(query)
+        yield {"type": "way", "id": 99}
+        yield from elements
+
+    monkeypatch.setattr(app, "iter_overpass_elements", fake_elements)
+    pages = list(app.iter_osm_address_pages(CENTER[0], CENTER[1], 500, cache=tile_cache, page_size=2))
+    assert [len(page) for page in pages] == [2, 2, 1]
+    # A second search is served from the cached tiles without a query
+    cached = list(app.iter_osm_address_pages(CENTER[0], CENTER[1], 500, cache=tile_cache))
+    assert len(queries) == 1
+    assert len(tiles) > 1
+    assert sorted(p.place_id for page in cached for p in page) == sorted(f"osm:node/{i}" for i in range(5))
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+
+def make_places(app):
+    return [
+        app.Place("5 Ερμού", "5 Ερμού", 37.976, 23.730, "osm:node/1"),
+        app.Place("5 Ερμού", "5 Ερμού", 37.977, 23.731, "osm:node/2"),
+        app.Place("Café", "7 Σταδίου", 37.980, 23.733, "g:1", distance_m=12.5),
+    ]
+
+
+def assert_unique_strings(array):
+    assert len(array.strings) == len(set(array.strings))
+
+
+def test_from_places_interns_repeated_strings(app):
+    array = app.PlaceArray.from_places(make_places(app))
+    assert_unique_strings(array)
+    assert array.name_ids[0] == array.name_ids[1] == array.address_ids[0]
+    assert list(array) == make_places(app)
+
+
+def test_concat_merges_string_tables(app):
+    places = make_places(app)
+    array = app.PlaceArray.concat([app.as_place_array(places[:2]), app.as_place_array(places[1:])])
+    assert_unique_strings(array)
+    assert [p.place_id for p in array] == ["osm:node/1", "osm:node/2", "osm:node/2", "g:1"]
+    assert [p.distance_m for p in array] == [None, None, None, 12.5]
+
+
+def test_take_keeps_rows_and_distances(app):
+    array = app.as_place_array(make_places(app))
+    taken = array.take(np.array([2, 0]), distance_m=np.array([1.0, 2.0]))
+    assert [(p.address, p.distance_m) for p in taken] == [("7 Σταδίου", 1.0), ("5 Ερμού", 2.0)]
+    assert taken.strings is array.strings
+
+
+def test_to_frame_with_repeated_strings(app):
+    frame = app.as_place_array(make_places(app)).to_frame()
+    assert frame["address"].tolist() == ["5 Ερμού", "5 Ερμού", "7 Σταδίου"]
+    assert frame["name"].tolist() == ["5 Ερμού", "5 Ερμού", "Café"]
+    assert np.isnan(frame["distance_m"][0]) and frame["distance_m"][2] == 12.5
+
+
+def test_rows(app):
+    assert list(app.as_place_array(make_places(app)).rows())[2] == ("Café", "7 Σταδίου", 37.980, 23.733)
+
+
+@pytest.fixture
+def point_index(app, tmp_path):
+    # Two neighbouring nodes share a label, as OSM address nodes often do
+    app.build_point_index([11, 12, 13], [37.9760, 37.9761, 37.9770], [23.7300, 23.7301, 23.7310],
+                          ["5 Ερμού", "5 Ερμού", "7 Ερμού"], str(tmp_path / "points"))
+    return app.AddressPointIndex(str(tmp_path / "points"))
+
+
+def test_point_index_query_interns_labels(app, point_index):
+    places = point_index.query(37.9760, 23.7300, 500)
+    assert_unique_strings(places)
+    assert [p.place_id for p in places] == ["osm:node/11", "osm:node/12", "osm:node/13"]
+    frame = app.places_to_dataframe(places)
+    assert frame["address"].tolist() == ["5 Ερμού", "5 Ερμού", "7 Ερμού"]
+    assert len(app.dedup_places(places).to_frame()) == 2
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+# 37.98 / 23.73 lie exactly on grid-row and grid-column boundaries of the point index
+CORNER = (37.98, 23.73)
+
+
+@pytest.fixture
+def corner_index(app, tmp_path):
+    offsets = [(-1e-4, -1e-4), (-1e-4, 1e-4), (1e-4, -1e-4), (1e-4, 1e-4), (0.0, 0.0), (0.004, 0.0), (0.0, -0.006), (0.02, 0.02)]
+    lats = [CORNER[0] + dlat for dlat, _ in offsets]
+    lons = [CORNER[1] + dlon for _, dlon in offsets]
+    app.build_point_index(list(range(100, 100 + len(offsets))), lats, lons, [f"{i} Odos" for i in range(len(offsets))],
+                          str(tmp_path / "points"))
+    return app.AddressPointIndex(str(tmp_path / "points")), np.array(lats), np.array(lons)
+
+
+def brute_force(app, lats, lons, lat, lon, radius):
+    distances = app.haversine_distances(lat, lon, lats, lons)
+    inside = np.flatnonzero(distances <= radius)
+    return inside[np.argsort(distances[inside], kind="stable")], distances
+
+
+@pytest.mark.parametrize("radius", [5, 20, 500, 700, 3000])
+def test_query_indices_across_cell_boundaries(app, corner_index, radius):
+    index, lats, lons = corner_index
+    positions, distances = index.query_indices(CORNER[0], CORNER[1], radius)
+    found_ids = sorted(index.ids[positions].tolist())
+    expected, all_distances = brute_force(app, lats, lons, CORNER[0], CORNER[1], radius)
+    assert found_ids == sorted((expected + 100).tolist())
+    assert np.all(np.diff(distances) >= 0)
+    assert np.allclose(np.sort(distances), np.sort(all_distances[expected]), atol=0.5)
+
+
+def test_query_indices_random_points(app, tmp_path):
+    rng = np.random.default_rng(1)
+    lats = CORNER[0] + rng.uniform(-0.02, 0.02, 2000)
+    lons = CORNER[1] + rng.uniform(-0.02, 0.02, 2000)
+    app.build_point_index(np.arange(2000), lats, lons, [str(i) for i in range(2000)], str(tmp_path / "points"))
+    index = app.AddressPointIndex(str(tmp_path / "points"))
+    for lat, lon, radius in [(CORNER[0], CORNER[1], 800), (37.9925, 23.7175, 1200), (37.9651, 23.745, 300)]:
+        positions, _ = index.query_indices(lat, lon, radius)
+        expected, _ = brute_force(app, lats, lons, lat, lon, radius)
+        assert sorted(index.ids[positions].tolist()) == sorted(expected.tolist())
+
+
+def test_point_index_from_gazetteer_keeps_osm_node_ids(app, tmp_path):
+    osm_path = tmp_path / "extract.osm"
+    osm_path.write_text("""<?xml version="1.0" encoding="UTF-8"?>
+<osm version="0.6">
+  <node id="987654321" lat="37.9800" lon="23.7300">
+    <tag k="addr:street" v="Ερμού"/><tag k="addr:housenumber" v="5"/>
+  </node>
+  <node id="123456789" lat="37.9801" lon="23.7301">
+    <tag k="addr:street" v="Ερμού"/><tag k="addr:housenumber" v="7"/><tag k="addr:postcode" v="10563"/>
+  </node>
+</osm>
+""", encoding="utf-8")
+    db_path = str(tmp_path / "gazetteer.sqlite")
+    app.build_gazetteer(str(osm_path), db_path)
+    assert app.build_point_index_from_gazetteer(db_path, str(tmp_path / "points")) == 2
+    places = app.AddressPointIndex(str(tmp_path / "points")).query(37.98, 23.73, 100)
+    assert [(p.place_id, p.address) for p in places] == [("osm:node/987654321", "5 Ερμού"), ("osm:node/123456789", "7 Ερμού, 10563")]
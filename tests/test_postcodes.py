@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+
+@pytest.mark.parametrize("address, expected", [
+    ("Παπαφλέσσα 145, Αθήνα, 18546", "18546"),
+    ("Παπαφλέσσα 145, Αθήνα, 185 46", "18546"),
+    ("Ermou 10 Athens 105 63", "10563"),
+    ("Odos 12345, Athens, 18546", "18546"),
+    ("Παπαφλέσσα 145, Αθήνα", None),
+])
+def test_extract_postcode(app, address, expected):
+    assert app.extract_postcode(address) == expected
+
+
+ADDRESSES = pd.Series(["Παπαφλέσσα 145, Αθήνα, 18546", "Odos 1, 185 46", "no postcode"], index=[10, 11, 12])
+EXPECTED = pd.Series(["18546", "18546", pd.NA], index=[10, 11, 12], dtype="string")
+
+
+def test_extract_postcodes_keeps_series_index(app):
+    pd.testing.assert_series_equal(app.extract_postcodes(ADDRESSES), EXPECTED)
+
+
+def test_extract_postcodes_fallback_matches_arrow(app, monkeypatch):
+    monkeypatch.setattr(app, "pc", None)
+    pd.testing.assert_series_equal(app.extract_postcodes(ADDRESSES), EXPECTED)
+
+
+def test_extract_postcodes_list_input(app):
+    result = app.extract_postcodes(["Odos 1, 18546", "nothing"])
+    pd.testing.assert_series_equal(result, pd.Series(["18546", pd.NA], dtype="string"))
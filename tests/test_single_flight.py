@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+
+def test_do_coalesces_concurrent_calls(app):
+    flight = app.SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", slow)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flight.do("key", slow)))
+    follower.start()
+    release.set()
+    leader.join(5)
+    follower.join(5)
+    assert results == ["result", "result"]
+    assert len(calls) == 1
+
+
+def test_stream_followers_replay_and_follow_the_leader(app):
+    flight = app.SingleFlight()
+    calls = []
+
+    def pages():
+        calls.append(1)
+        yield [1]
+        yield [2]
+
+    leader = flight.stream("query", pages)
+    assert next(leader) == [1]
+    replayed = threading.Event()
+    followed = []
+
+    def follow():
+        for page in flight.stream("query", pages):
+            followed.append(page)
+            replayed.set()
+
+    follower = threading.Thread(target=follow)
+    follower.start()
+    # The follower has replayed the first page while the leader is still in flight
+    assert replayed.wait(5)
+    assert list(leader) == [[2]]
+    follower.join(5)
+    assert followed == [[1], [2]]
+    assert len(calls) == 1
+
+
+def test_stream_shares_errors(app):
+    flight = app.SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        yield "partial"
+        release.wait(5)
+        raise ValueError("Overpass error")
+
+    leader = flight.stream("query", failing)
+    assert next(leader) == "partial"
+    errors = []
+
+    def follow():
+        try:
+            list(flight.stream("query", failing))
+        except ValueError as e:
+            errors.append(e)
+
+    follower = threading.Thread(target=follow)
+    follower.start()
+    release.set()
+    with pytest.raises(ValueError):
+        list(leader)
+    follower.join(5)
+    assert len(errors) == 1
+
+
+def test_stream_starts_again_after_finishing(app):
+    flight = app.SingleFlight()
+    calls = []
+
+    def pages():
+        calls.append(1)
+        yield "page"
+
+    assert list(flight.stream("query", pages)) == ["page"]
+    assert list(flight.stream("query", pages)) == ["page"]
+    assert len(calls) == 2
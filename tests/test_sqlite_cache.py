@@ -0,0 +1,56 @@
+import sqlite3
+
+
+def open_cache(app, tmp_path, **options):
+    return app.SQLiteCache(str(tmp_path / "cache.sqlite"), table="test", **options)
+
+
+def stored_keys(tmp_path):
+    with sqlite3.connect(str(tmp_path / "cache.sqlite")) as conn:
+        return {key for (key,) in conn.execute("SELECT key FROM test")}
+
+
+def test_get_returns_stored_value(app, tmp_path):
+    cache = open_cache(app, tmp_path)
+    cache.set("a", [1.5, 2.5])
+    assert cache.get("a") == [1.5, 2.5]
+    assert cache.get("missing") is None
+
+
+def test_expired_entries_miss_and_are_swept_on_open(app, tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(app.time, "time", lambda: now[0])
+    cache = open_cache(app, tmp_path, ttl=60)
+    cache.set("old", 1)
+    now[0] += 30
+    cache.set("new", 2)
+    now[0] += 45
+    assert cache.get("old") is None
+    assert cache.get("new") == 2
+    # Reopening evicts the expired row without waiting for the periodic sweep
+    open_cache(app, tmp_path, ttl=60)
+    assert stored_keys(tmp_path) == {"new"}
+
+
+def test_least_recently_accessed_entries_are_evicted(app, tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(app.time, "time", lambda: now[0])
+    cache = open_cache(app, tmp_path, max_entries=2)
+    for key in ("a", "b", "c"):
+        now[0] += 1
+        cache.set(key, key)
+    now[0] += 1
+    # Reading "a" makes "b" the least recently used entry
+    assert cache.get("a") == "a"
+    open_cache(app, tmp_path, max_entries=2)
+    assert stored_keys(tmp_path) == {"a", "c"}
+
+
+def test_stats_count_hits_and_misses(app, tmp_path):
+    cache = open_cache(app, tmp_path)
+    assert cache.stats() == {"hits": 0, "misses": 0, "hit_rate": 0.0}
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+    assert cache.stats() == {"hits": 2, "misses": 1, "hit_rate": 2 / 3}
@@ -0,0 +1,103 @@
+import io
+import json
+
+import pytest
+
+DOCUMENT = {
+    "version": 0.6,
+    "elements": [
+        {"type": "node", "id": 1, "lat": 37.98, "lon": 23.73, "tags": {"addr:street": "Ερμού", "addr:housenumber": "10"}},
+        {"type": "node", "id": 2, "lat": 37.99, "lon": 23.74, "tags": {"name": "[not] an {array}, \"quoted\""}},
+        {"type": "node", "id": 3, "lat": 38.0, "lon": 23.75, "tags": {}},
+    ],
+    "remark": "trailing",
+}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64 * 1024])
+def test_iter_json_array_items_yields_every_item(app, chunk_size):
+    # Small chunks split multi-byte characters and items across reads
+    stream = io.BytesIO(json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8"))
+    assert list(app.iter_json_array_items(stream, "elements", chunk_size)) == DOCUMENT["elements"]
+
+
+def test_iter_json_array_items_empty_array(app):
+    stream = io.BytesIO(b'{"elements": [ ]}')
+    assert list(app.iter_json_array_items(stream, "elements", 4)) == []
+
+
+def test_iter_json_array_items_missing_key(app):
+    stream = io.BytesIO(b'{"remark": "runtime error"}')
+    with pytest.raises(ValueError):
+        list(app.iter_json_array_items(stream, "elements"))
+
+
+@pytest.mark.parametrize("chunk_size", [3, 64 * 1024])
+def test_iter_json_array_items_checks_rest_of_document(app, chunk_size):
+    checked = []
+    stream = io.BytesIO(json.dumps(DOCUMENT, ensure_ascii=False).encode("utf-8"))
+    items = list(app.iter_json_array_items(stream, "elements", chunk_size, check_document=checked.append))
+    assert items == DOCUMENT["elements"]
+    assert checked == [dict(DOCUMENT, elements=[])]
+
+
+def test_iter_json_array_items_truncated(app):
+    stream = io.BytesIO(b'{"elements": [{"id": 1}, {"id": 2')
+    items = app.iter_json_array_items(stream, "elements", 8)
+    assert next(items) == {"id": 1}
+    with pytest.raises(ValueError):
+        next(items)
+
+
+OVERPASS_REMARK = "runtime error: Query timed out in \"query\" at line 3 after 25 seconds."
+
+
+class FakeResponse(io.BytesIO):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+@pytest.fixture(params=["ijson", "stdlib"])
+def overpass_response(request, app, monkeypatch):
+    """
+    Serves a fixed Overpass response body to iter_overpass_elements, with either parser.
+    """
+    if request.param == "stdlib":
+        monkeypatch.setattr(app, "ijson", None)
+    elif app.ijson is None:
+        pytest.skip("ijson is not installed")
+    body = {}
+
+    def urlopen(request, timeout=None):
+        return FakeResponse(json.dumps(body["document"]).encode("utf-8"))
+
+    monkeypatch.setattr(app.urllib.request, "urlopen", urlopen)
+    return body
+
+
+def test_iter_overpass_elements(app, overpass_response):
+    overpass_response["document"] = {"version": 0.6, "elements": DOCUMENT["elements"]}
+    assert list(app.iter_overpass_elements("query")) == DOCUMENT["elements"]
+
+
+@pytest.mark.parametrize("document", [
+    {"version": 0.6, "elements": [], "remark": OVERPASS_REMARK},
+    {"version": 0.6, "elements": DOCUMENT["elements"][:1], "remark": OVERPASS_REMARK},
+    {"version": 0.6, "remark": OVERPASS_REMARK},
+])
+def test_iter_overpass_elements_raises_runtime_error(app, overpass_response, document):
+    overpass_response["document"] = document
+    with pytest.raises(app.overpy.exception.OverpassRuntimeError):
+        list(app.iter_overpass_elements("query"))
+
+
+def test_failed_overpass_response_is_not_cached(app, overpass_response, tmp_path):
+    overpass_response["document"] = {"version": 0.6, "elements": [], "remark": OVERPASS_REMARK}
+    cache = app.SQLiteCache(str(tmp_path / "tiles.sqlite"), table="overpass_tiles")
+    tiles = app.covering_tiles(37.98, 23.73, 500)
+    with pytest.raises(app.overpy.exception.OverpassRuntimeError):
+        list(app.stream_osm_tiles(tiles, "query", cache=cache))
+    assert all(cache.get(f"z{app.OVERPASS_TILE_ZOOM}/{x}/{y}") is None for x, y in tiles)